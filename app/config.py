@@ -77,6 +77,9 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-here"
     
     ai_service_url: str = "https://ai.grucode.dev"  # Default AI service URL
+    
+    # Seconds a parsed convo definition is reused between chat turns (0 disables)
+    convo_cache_ttl_seconds: float = 60.0
 
 
     # MinIO Storage Settings
@@ -1,7 +1,7 @@
 
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from enum import Enum
 
 
@@ -162,6 +162,12 @@ class AINodeConfig(BaseModel):
     context_variables: List[str] = Field(default_factory=list, description="Session context variables to include")
     exit_keywords: List[str] = Field(default_factory=list, description="Keywords to exit AI chat mode")
     exit_node_id: Optional[str] = Field(None, description="Node ID to jump to when exit keyword is detected")
+    
+    # Derived from the fields above on first use by ConvoService
+    _exit_pattern: Optional[Any] = PrivateAttr(default=None)
+    _exit_instructions: str = PrivateAttr(default="")
+    _context_var_set: Optional[frozenset] = PrivateAttr(default=None)
+    _exit_response: Optional[Dict[str, Any]] = PrivateAttr(default=None)
 
 class ConvoNode(BaseModel):
     """Base model for a convo node."""
@@ -199,6 +205,13 @@ class ConvoNode(BaseModel):
     # Metadata
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
     
+    # Menu options, cached by ConvoService when no transition label uses context
+    _static_options: Optional[tuple] = PrivateAttr(default=None)
+    # Option number / lowercased label -> target node id, built on first use
+    _transition_lookup: Optional[Dict[str, str]] = PrivateAttr(default=None)
+    # Transitions by descending priority, built on first use
+    _sorted_transitions: Optional[tuple] = PrivateAttr(default=None)
+    
     class Config:
         use_enum_values = True
 
@@ -227,6 +240,9 @@ class ConvoDefinition(BaseModel):
     tags: List[str] = Field(default_factory=list)
     metadata: Dict[str, Any] = Field(default_factory=dict)
     
+    # id -> node lookup, built on first use by ConvoService
+    _node_index: Optional[Dict[str, ConvoNode]] = PrivateAttr(default=None)
+    
     class Config:
         json_schema_extra = {
             "example": {
@@ -264,6 +280,10 @@ class ChatSession(BaseModel):
     completed: bool = Field(default=False)
     
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    
+    # Number of history entries already persisted; None means unknown, so the
+    # next write replaces the whole history array.
+    _history_flushed: Optional[int] = PrivateAttr(default=None)
 
 
 class AIChatSessionCreate(BaseModel):
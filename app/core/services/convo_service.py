@@ -1,11 +1,24 @@
 
+import ast
+import asyncio
+import base64
+import functools
+import operator
 import json
 import mimetypes
 import logging
-from typing import Dict, Any, List, Optional
+import os
+import re
+import smtplib
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple
 from datetime import datetime
+from urllib.parse import urlparse
 import uuid
+import orjson
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
 from app.config import Settings
 from app.core.models.convo import (
     ConvoDefinition,
@@ -13,9 +26,10 @@ from app.core.models.convo import (
     ConvoNode,
     ChatRequest,
     ChatResponse,
-    ChatMessage,
     NodeType, 
     NodeAction,
+    ApiAction,
+    AINodeConfig,
     AIChatSession,
     AIChatSessionCreate,
     AIChatQuery,
@@ -33,6 +47,564 @@ import httpx
 
 logger = logging.getLogger(__name__)
 
+# Strong references to fire-and-forget tasks so they are not garbage collected
+# before completion.
+_background_tasks: set = set()
+
+
+def _spawn_background(coro) -> asyncio.Task:
+    """Schedule a coroutine without awaiting it."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+# Shared outbound HTTP client so connections and TLS sessions are reused
+# across requests (ConvoService itself is created per request).
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            # Fail fast on unreachable hosts; per-call timeouts override the rest
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _mk_msg(
+    role: str,
+    content: str,
+    node_id: Optional[str],
+    timestamp: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Build a session history entry (same shape as ``ChatMessage``, without validation)."""
+    return {
+        "role": role,
+        "content": content,
+        "node_id": node_id,
+        "timestamp": timestamp or datetime.utcnow()
+    }
+
+
+# AI service access token, shared across requests and refreshed shortly before
+# it expires (or when the service rejects it).
+_AI_TOKEN_DEFAULT_TTL = 300.0
+_ai_token: Optional[str] = None
+_ai_token_expires_at: float = 0.0
+_ai_token_lock = asyncio.Lock()
+
+
+def invalidate_ai_token(token: Optional[str] = None) -> None:
+    """Drop the cached AI service token (only if it is still ``token``, when given)."""
+    global _ai_token, _ai_token_expires_at
+    if token is None or token == _ai_token:
+        _ai_token = None
+        _ai_token_expires_at = 0.0
+
+
+# Authenticated SMTP connections kept open between sends, keyed by
+# (server, port, username, password). Sends run in worker threads; each
+# connection is used by one thread at a time under its lock.
+_SMTP_TIMEOUT = 30.0
+_smtp_connections: Dict[Tuple[str, int, str, str], smtplib.SMTP] = {}
+_smtp_locks: Dict[Tuple[str, int, str, str], threading.Lock] = {}
+_smtp_locks_guard = threading.Lock()
+
+
+def _smtp_connect(server: str, port: int, username: str, password: str) -> smtplib.SMTP:
+    conn = smtplib.SMTP(server, port, timeout=_SMTP_TIMEOUT)
+    try:
+        conn.starttls()
+        conn.login(username, password)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def _smtp_send(config: Any, to_email: str, msg: Any) -> None:
+    """Send ``msg`` over a cached SMTP connection (blocking; run in a thread).
+    
+    A connection the server has since dropped is reopened once.
+    """
+    key = (config.smtp_server, config.smtp_port, config.username, config.password)
+    with _smtp_locks_guard:
+        lock = _smtp_locks.setdefault(key, threading.Lock())
+    
+    text = msg.as_string()
+    with lock:
+        for attempt in range(2):
+            conn = _smtp_connections.get(key)
+            if conn is None:
+                conn = _smtp_connect(*key)
+                _smtp_connections[key] = conn
+            try:
+                conn.sendmail(config.from_email, to_email, text)
+                return
+            except smtplib.SMTPServerDisconnected:
+                _smtp_connections.pop(key, None)
+                conn.close()
+                if attempt:
+                    raise
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+                # Only this message was rejected; the session is still usable
+                raise
+            except Exception:
+                _smtp_connections.pop(key, None)
+                conn.close()
+                raise
+
+
+def _close_smtp_connections() -> None:
+    for key in list(_smtp_connections):
+        conn = _smtp_connections.pop(key, None)
+        if conn is None:
+            continue
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+
+async def close_smtp_connections() -> None:
+    """Close the cached SMTP connections."""
+    await asyncio.to_thread(_close_smtp_connections)
+
+
+# Convo definitions are read on every chat turn but rarely change, so recently
+# used ones are kept for a short time (Settings.convo_cache_ttl_seconds). Writes
+# through this process drop their entry right away; other workers see changes
+# once the TTL runs out.
+_CONVO_CACHE_MAX_SIZE = 256
+_convo_cache: Dict[str, Tuple[float, ConvoDefinition]] = {}
+# In-flight loads, so concurrent misses for one convo share a single fetch
+_convo_loads: Dict[str, asyncio.Future] = {}
+# Bumped on every invalidation; loads started before it are not cached
+_convo_cache_generation = 0
+
+
+def _get_cached_convo(convo_id: str) -> Optional[ConvoDefinition]:
+    entry = _convo_cache.get(convo_id)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        _convo_cache.pop(convo_id, None)
+        return None
+    # Mark as most recently used (dicts keep insertion order)
+    _convo_cache[convo_id] = _convo_cache.pop(convo_id)
+    return entry[1]
+
+
+def _cache_convo(convo: ConvoDefinition, ttl: float) -> None:
+    if convo.id not in _convo_cache and len(_convo_cache) >= _CONVO_CACHE_MAX_SIZE:
+        # Evict the least recently used entry
+        _convo_cache.pop(next(iter(_convo_cache)))
+    _convo_cache[convo.id] = (time.monotonic() + ttl, convo)
+
+
+def invalidate_convo_cache(convo_id: Optional[str] = None) -> None:
+    """Drop one cached convo definition, or all of them."""
+    global _convo_cache_generation
+    _convo_cache_generation += 1
+    if convo_id is None:
+        _convo_cache.clear()
+        _convo_loads.clear()
+    else:
+        _convo_cache.pop(convo_id, None)
+        _convo_loads.pop(convo_id, None)
+
+
+# Fixed retrieval settings sent with every AI chat query
+_AI_QUERY_DEFAULTS: Dict[str, Any] = {
+    "max_history_messages": 5,
+    "max_documents": 10,
+    "min_score": 0.1,
+    "strategy": "simple",
+    "include_metadata": True,
+    "include_chat_history": False,
+    "temperature": 0.1,
+    "filter": {"source_table": "frequently_asked_questions"}
+}
+
+
+def _jwt_ttl(token: str) -> Optional[float]:
+    """Seconds until a JWT's ``exp`` claim, or None if it cannot be read."""
+    try:
+        claims = token.split(".")[1]
+        exp = orjson.loads(base64.urlsafe_b64decode(claims + "=" * (-len(claims) % 4)))["exp"]
+        return float(exp) - time.time()
+    except Exception:
+        return None
+
+
+def _safe_unlink(path: str) -> None:
+    """Delete a temp file, logging instead of raising on failure."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Failed to delete temp file {path}: {e}")
+
+
+_UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+def _multipart_file_upload(
+    fields: Dict[str, str],
+    file_field: str,
+    filename: str,
+    file_path: str,
+    content_type: str = "application/octet-stream"
+) -> Tuple[Dict[str, str], AsyncIterator[bytes]]:
+    """Build a streamed multipart/form-data body for a form plus one file.
+    
+    Returns the request headers (with an exact Content-Length) and an async
+    iterator that yields the body, reading the file in chunks in a worker
+    thread so neither the loop blocks nor the whole file is held in memory.
+    """
+    boundary = uuid.uuid4().hex
+    
+    def quote(value: str) -> str:
+        return str(value).replace('"', "%22")
+    
+    head = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{quote(name)}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ) + (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{quote(file_field)}"; '
+        f'filename="{quote(filename)}"\r\nContent-Type: {content_type}\r\n\r\n'
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    
+    headers = {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(head) + os.path.getsize(file_path) + len(tail))
+    }
+    
+    async def body() -> AsyncIterator[bytes]:
+        yield head
+        f = await asyncio.to_thread(open, file_path, "rb")
+        try:
+            while chunk := await asyncio.to_thread(f.read, _UPLOAD_CHUNK_SIZE):
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+        yield tail
+    
+    return headers, body()
+
+
+# Multiple of 3 so each block encodes to base64 without padding
+_BASE64_READ_SIZE = 3 * (1 << 18)
+
+
+def _json_with_base64_file(
+    payload: Dict[str, Any],
+    field: str,
+    file_path: str
+) -> Tuple[Dict[str, str], AsyncIterator[bytes]]:
+    """Build a streamed JSON body of ``payload`` plus ``field`` = base64 of a file.
+    
+    The file is read and encoded block by block in a worker thread while the
+    body is sent, so peak memory is one block instead of the raw file, its
+    encoding and the serialized JSON all at once.
+    """
+    # payload is a non-empty object: drop its closing brace and open the string field
+    head = orjson.dumps(payload)[:-1] + b',' + orjson.dumps(field) + b':"'
+    tail = b'"}'
+    encoded_size = 4 * -(-os.path.getsize(file_path) // 3)
+    
+    headers = {
+        "Content-Type": "application/json",
+        "Content-Length": str(len(head) + encoded_size + len(tail))
+    }
+    
+    def read_encoded(f) -> bytes:
+        return base64.b64encode(f.read(_BASE64_READ_SIZE))
+    
+    async def body() -> AsyncIterator[bytes]:
+        yield head
+        f = await asyncio.to_thread(open, file_path, "rb")
+        try:
+            while chunk := await asyncio.to_thread(read_encoded, f):
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+        yield tail
+    
+    return headers, body()
+
+
+# 57 raw bytes encode to one 76-character MIME line
+_MIME_BASE64_READ_SIZE = 57 * 1000
+
+
+def _read_file_base64_lines(file_path: str) -> str:
+    """Read a file as MIME base64 text (76-character lines), block by block.
+    
+    Equivalent to ``encoders.encode_base64`` on the whole file, without
+    holding the raw bytes next to their encoding.
+    """
+    lines = []
+    with open(file_path, "rb") as f:
+        while block := f.read(_MIME_BASE64_READ_SIZE):
+            lines.append(base64.encodebytes(block).decode('ascii'))
+    return ''.join(lines)
+
+
+_MISSING = object()
+
+_BY_PRIORITY = operator.attrgetter("priority")
+
+# Navigation commands (matched against stripped, lowercased input)
+_MENU_COMMANDS = frozenset({"menu", "main menu", "main", "hello", "hi"})
+_BACK_COMMANDS = frozenset({"back", "previous"})
+# "hello"/"hi" are handled as menu commands
+_RESTART_COMMANDS = frozenset({"restart", "start over"})
+_NAVIGATION_COMMANDS = _MENU_COMMANDS | _BACK_COMMANDS | _RESTART_COMMANDS
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_path(path: str) -> Tuple[str, ...]:
+    """Split a dotted path ("user.address.city") into its components."""
+    return tuple(path.split("."))
+
+
+def _walk_path(data: Any, path: Tuple[str, ...]) -> Tuple[bool, Any]:
+    """Follow pre-split path components through nested dicts."""
+    for part in path:
+        if not isinstance(data, dict):
+            return False, None
+        data = data.get(part, _MISSING)
+        if data is _MISSING:
+            return False, None
+    return True, data
+
+
+# Node types allowed in string transition conditions: comparisons, boolean
+# logic, arithmetic, literals, names and subscripts. No calls or attribute
+# access, so a condition can only read values from the session context.
+_CONDITION_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.In, ast.NotIn, ast.Is, ast.IsNot,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.FloorDiv,
+    ast.IfExp, ast.Name, ast.Load, ast.Constant, ast.List, ast.Tuple, ast.Set,
+    ast.Subscript, ast.Slice,
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_condition(source: str):
+    """Parse, validate and compile a string condition once."""
+    tree = ast.parse(source.strip(), mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _CONDITION_NODES):
+            raise ValueError(f"Unsupported expression in condition: {type(node).__name__}")
+    return compile(tree, "<condition>", "eval")
+
+
+_TEMPLATE_RE = re.compile(r'\{\{([^}]+)\}\}')
+
+
+@functools.lru_cache(maxsize=2048)
+def _parse_template(template: str) -> tuple:
+    """Split a template into literal strings and variable segments.
+    
+    Variable segments are ``(path_parts, keys_to_extract, placeholder)`` tuples,
+    where ``placeholder`` is the original ``{{...}}`` text kept for misses.
+    """
+    segments = []
+    pos = 0
+    for match in _TEMPLATE_RE.finditer(template):
+        if match.start() > pos:
+            segments.append(template[pos:match.start()])
+        
+        # Parse variable for filters (format: var_name:key1,key2)
+        var_name = match.group(1).strip()
+        keys_to_extract = None
+        if ':' in var_name:
+            parts = var_name.split(':')
+            var_name = parts[0].strip()
+            keys_to_extract = tuple(k.strip() for k in parts[1].split(','))
+        
+        segments.append((tuple(var_name.split('.')), keys_to_extract, match.group(0)))
+        pos = match.end()
+    
+    if pos < len(template):
+        segments.append(template[pos:])
+    return tuple(segments)
+
+
+# Patterns used by the built-in input validations
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_PHONE_STRIP_RE = re.compile(r'[\s\-\(\)\+]')
+_PHONE_RE = re.compile(r'^\d{10,15}$')
+_URL_RE = re.compile(r'^https?://[^\s/$.?#].[^\s]*$', re.IGNORECASE)
+_ALNUM_RE = re.compile(r'^[a-zA-Z0-9]+$')
+_ALPHA_RE = re.compile(r'^[a-zA-Z]+$')
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_validation_pattern(pattern: str) -> re.Pattern:
+    """Compile a user-supplied ``regex`` validation pattern once."""
+    return re.compile(pattern)
+
+
+# Input validators: each takes (user_input, stripped_input, params, error_message)
+# and returns the error to show, or None when the input passes.
+
+def _v_required(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    if not stripped:
+        return error_message or "This field is required."
+    return None
+
+
+def _v_min_length(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    min_len = params.get("value", params.get("min", 0))
+    if len(user_input) < min_len:
+        return error_message or f"Input must be at least {min_len} characters."
+    return None
+
+
+def _v_max_length(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    max_len = params.get("value", params.get("max", 1000))
+    if len(user_input) > max_len:
+        return error_message or f"Input must not exceed {max_len} characters."
+    return None
+
+
+def _v_length(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    min_len = params.get("min", 0)
+    max_len = params.get("max", float('inf'))
+    if len(user_input) < min_len or len(user_input) > max_len:
+        return error_message or f"Input must be between {min_len} and {max_len} characters."
+    return None
+
+
+def _v_email(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    if not _EMAIL_RE.match(stripped):
+        return error_message or "Please enter a valid email address."
+    return None
+
+
+def _v_phone(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    # Remove common phone number characters, then expect 10-15 digits
+    if not _PHONE_RE.match(_PHONE_STRIP_RE.sub('', user_input)):
+        return error_message or "Please enter a valid phone number."
+    return None
+
+
+def _v_number(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    try:
+        float(stripped)
+    except ValueError:
+        return error_message or "Please enter a valid number."
+    return None
+
+
+def _v_integer(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    try:
+        int(stripped)
+    except ValueError:
+        return error_message or "Please enter a valid integer."
+    return None
+
+
+def _v_regex(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    pattern = params.get("pattern", params.get("value"))
+    if pattern and not _compile_validation_pattern(pattern).match(user_input):
+        return error_message or "Input does not match the required format."
+    return None
+
+
+def _v_range(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    try:
+        value = float(stripped)
+    except ValueError:
+        return error_message or "Please enter a valid number."
+    min_val = params.get("min", float('-inf'))
+    max_val = params.get("max", float('inf'))
+    if value < min_val or value > max_val:
+        return error_message or f"Value must be between {min_val} and {max_val}."
+    return None
+
+
+def _v_url(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    if not _URL_RE.match(stripped):
+        return error_message or "Please enter a valid URL."
+    return None
+
+
+def _v_date(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    date_format = params.get("format", "%Y-%m-%d")
+    try:
+        datetime.strptime(stripped, date_format)
+    except ValueError:
+        return error_message or f"Please enter a valid date in format {date_format}."
+    return None
+
+
+def _v_alphanumeric(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    if not _ALNUM_RE.match(user_input):
+        return error_message or "Input must contain only letters and numbers."
+    return None
+
+
+def _v_alpha(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    if not _ALPHA_RE.match(user_input):
+        return error_message or "Input must contain only letters."
+    return None
+
+
+def _v_in_list(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    allowed_values = params.get("values", params.get("list", []))
+    if stripped not in allowed_values:
+        return error_message or f"Input must be one of: {', '.join(allowed_values)}."
+    return None
+
+
+def _v_not_in_list(user_input: str, stripped: str, params: Dict[str, Any], error_message: str) -> Optional[str]:
+    forbidden_values = params.get("values", params.get("list", []))
+    if stripped in forbidden_values:
+        return error_message or "This value is not allowed."
+    return None
+
+
+_VALIDATORS: Dict[str, Callable[[str, str, Dict[str, Any], str], Optional[str]]] = {
+    "required": _v_required,
+    "min_length": _v_min_length,
+    "max_length": _v_max_length,
+    "length": _v_length,
+    "email": _v_email,
+    "phone": _v_phone,
+    "number": _v_number,
+    "integer": _v_integer,
+    "regex": _v_regex,
+    "range": _v_range,
+    "url": _v_url,
+    "date": _v_date,
+    "alphanumeric": _v_alphanumeric,
+    "alpha": _v_alpha,
+    "in_list": _v_in_list,
+    "not_in_list": _v_not_in_list,
+}
+
 
 class ConvoService:
     """Service for managing convos and chat sessions."""
@@ -43,14 +615,20 @@ class ConvoService:
         self.auth_database = auth_database
         self.convos_collection = database["chat_convos"]
         self.sessions_collection = database["chat_sessions"]
-        self.ai_sessions_collection = database["ai_chat_sessions"]
+        self.ai_chat_sessions_collection = database["ai_chat_sessions"]
         self.ai_interactions_collection = database["ai_interactions"]
+        self.ai_chat_history_collection = database["ai_chat_history"]
         self.storage_service = StorageService(settings)
         self.logger = logging.getLogger(__name__)
         
         # AI service configuration
         self.ai_service_url = self.settings.ai_service_url or "http://localhost:8001"
     
+    @property
+    def _http(self) -> httpx.AsyncClient:
+        """Shared, connection-pooled HTTP client."""
+        return get_http_client()
+    
     def _get_tenant_uid(self, provided_tenant_uid: Optional[str], user: Optional[Any] = None) -> Optional[str]:
         """Get tenant_uid from provided value or extract from user context.
         
@@ -85,7 +663,8 @@ class ConvoService:
             )
             
         # Validate that start node exists
-        start_node = next((node for node in convo.nodes if node.id == convo.start_node_id), None)
+        nodes_by_id = self._node_index(convo)
+        start_node = nodes_by_id.get(convo.start_node_id)
         if not start_node:
             raise APIServiceException(
                 message=f"Start node '{convo.start_node_id}' not found in convo",
@@ -93,10 +672,9 @@ class ConvoService:
             )
             
         # Validate that all transitions point to valid nodes
-        node_ids = {n.id for n in convo.nodes}
         for node in convo.nodes:
             for transition in node.transitions or []:
-                if transition.target_node_id not in node_ids:
+                if transition.target_node_id not in nodes_by_id:
                     raise APIServiceException(
                         message=f"Transition from node '{node.id}' points to non-existent node '{transition.target_node_id}'",
                         http_status_code=400
@@ -108,18 +686,16 @@ class ConvoService:
             # Validate convo
             self._validate_convo(convo)
             
-            # Check if convo with same ID exists
-            existing = await self.convos_collection.find_one({"id": convo.id})
-            if existing:
+            # Insert convo; the unique index on "id" rejects duplicates
+            convo_dict = convo.model_dump()
+            try:
+                await self.convos_collection.insert_one(convo_dict)
+            except DuplicateKeyError:
                 raise APIServiceException(
                     message=f"Convo with ID '{convo.id}' already exists",
                     http_status_code=400
                 )
             
-            # Insert convo
-            convo_dict = convo.model_dump()
-            await self.convos_collection.insert_one(convo_dict)
-            
             logger.info(f"Created convo: {convo.id}")
             return convo
             
@@ -135,6 +711,23 @@ class ConvoService:
     
     async def get_convo(self, convo_id: str) -> Optional[ConvoDefinition]:
         """Get a convo by ID."""
+        convo = _get_cached_convo(convo_id)
+        if convo is not None:
+            return convo
+        
+        load = _convo_loads.get(convo_id)
+        if load is None:
+            load = asyncio.ensure_future(self._load_convo(convo_id))
+            _convo_loads[convo_id] = load
+            load.add_done_callback(
+                lambda done: _convo_loads.pop(convo_id, None) if _convo_loads.get(convo_id) is done else None
+            )
+        # Shielded so one cancelled request does not cancel the shared load
+        return await asyncio.shield(load)
+    
+    async def _load_convo(self, convo_id: str) -> Optional[ConvoDefinition]:
+        """Fetch and parse a convo from the database, caching the result."""
+        generation = _convo_cache_generation
         try:
             convo_dict = await self.convos_collection.find_one({"id": convo_id})
             if not convo_dict:
@@ -142,7 +735,11 @@ class ConvoService:
             
             # Remove MongoDB _id field
             convo_dict.pop("_id", None)
-            return ConvoDefinition(**convo_dict)
+            convo = ConvoDefinition(**convo_dict)
+            ttl = self.settings.convo_cache_ttl_seconds
+            if ttl > 0 and generation == _convo_cache_generation:
+                _cache_convo(convo, ttl)
+            return convo
             
         except Exception as e:
             logger.error(f"Error getting convo: {e}")
@@ -167,14 +764,12 @@ class ConvoService:
             if tenant_uid:
                 query["tenant_uid"] = tenant_uid
             
-            cursor = self.convos_collection.find(query).skip(skip).limit(limit)
-            convos = []
-            
-            async for convo_dict in cursor:
-                convo_dict.pop("_id", None)
-                convos.append(ConvoDefinition(**convo_dict))
+            cursor = self.convos_collection.find(query, projection={"_id": 0})\
+                .skip(skip)\
+                .limit(limit)\
+                .batch_size(min(limit, 100))
             
-            return convos
+            return [ConvoDefinition(**convo_dict) for convo_dict in await cursor.to_list(length=limit)]
             
         except Exception as e:
             logger.error(f"Error listing convos: {e}")
@@ -194,22 +789,20 @@ class ConvoService:
             # Validate convo
             self._validate_convo(convo)
             
-            # Check if convo exists
-            existing = await self.convos_collection.find_one({"id": convo_id})
-            if not existing:
-                raise APIServiceException(
-                    message=f"Convo '{convo_id}' not found",
-                    http_status_code=404
-                )
-            
             # Update convo
             convo_dict = convo.model_dump()
             convo_dict["updated_at"] = datetime.utcnow()
             
-            await self.convos_collection.replace_one(
+            result = await self.convos_collection.replace_one(
                 {"id": convo_id},
                 convo_dict
             )
+            if result.matched_count == 0:
+                raise APIServiceException(
+                    message=f"Convo '{convo_id}' not found",
+                    http_status_code=404
+                )
+            invalidate_convo_cache(convo_id)
             
             logger.info(f"Updated convo: {convo_id}")
             return convo
@@ -228,6 +821,7 @@ class ConvoService:
         """Delete a convo."""
         try:
             result = await self.convos_collection.delete_one({"id": convo_id})
+            invalidate_convo_cache(convo_id)
             
             if result.deleted_count == 0:
                 raise APIServiceException(
@@ -268,6 +862,9 @@ class ConvoService:
             context = request.context or {}
             context['identifier'] = request.email if request.email else None
         
+            # Single timestamp for every field written by this request
+            now = datetime.utcnow()
+        
             # Create session with generated session_id
             session = ChatSession(
                 session_id=str(uuid.uuid4()),
@@ -277,16 +874,13 @@ class ConvoService:
                 current_node_id=convo.start_node_id,
                 context=context,
                 history=[],
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow(),
-                last_activity=datetime.utcnow()
+                created_at=now,
+                updated_at=now,
+                last_activity=now
             )
         
             # Get the start node
-            start_node = next(
-                (node for node in convo.nodes if node.id == convo.start_node_id),
-                None
-            )
+            start_node = self._node_index(convo).get(convo.start_node_id)
         
             if not start_node:
                 raise APIServiceException(
@@ -310,11 +904,12 @@ class ConvoService:
                 )
         
             # Update session with any context changes
-            session.last_activity = datetime.utcnow()
+            session.last_activity = now
         
             # Insert session into database
-            session_dict = session.model_dump()
+            session_dict = session.model_dump(mode="python", exclude_none=True)
             await self.sessions_collection.insert_one(session_dict)
+            session._history_flushed = len(session.history)
         
             logger.info(f"Created chat session: {session.session_id}")
         
@@ -348,12 +943,18 @@ class ConvoService:
     async def get_chat_session(self, session_id: str) -> Optional[ChatSession]:
         """Get a chat session by ID."""
         try:
-            session_dict = await self.sessions_collection.find_one({"session_id": session_id})
+            session_dict = await self.sessions_collection.find_one(
+                {"session_id": session_id},
+                projection={"_id": 0}
+            )
             if not session_dict:
                 return None
             
-            session_dict.pop("_id", None)
-            return ChatSession(**session_dict)
+            # Written by this service from a validated ChatSession; all fields are
+            # flat (dicts/lists/datetimes), so skip re-validation on every turn
+            session = ChatSession.model_construct(**session_dict)
+            session._history_flushed = len(session.history)
+            return session
             
         except Exception as e:
             logger.error(f"Error getting chat session: {e}")
@@ -373,6 +974,8 @@ class ConvoService:
     ) -> ChatResponse:
         """Continue an existing chat session with a user message."""
         try:
+            now = datetime.utcnow()
+            
             # Get session
             session = await self.get_chat_session(session_id)
             if not session:
@@ -412,10 +1015,7 @@ class ConvoService:
                 )
             
             # Get current node
-            current_node = next(
-                (node for node in convo.nodes if node.id == session.current_node_id),
-                None
-            )
+            current_node = self._node_index(convo).get(session.current_node_id)
             if not current_node:
                 raise APIServiceException(
                     message=f"Current node '{session.current_node_id}' not found",
@@ -449,39 +1049,27 @@ class ConvoService:
                 )
             
             # Add user message to history
-            session.history.append({
-                "role": "user",
-                "content": user_message,
-                "node_id": current_node.id,
-                "timestamp": datetime.utcnow().isoformat()
-            })
+            session.history.append(_mk_msg(
+                "user",
+                user_message,
+                current_node.id,
+                now
+            ))
             
             # Process node and get response
             response_data = await self._process_node(session, current_node, user_message, convo)
             
             # Determine which node we're actually on after processing
             actual_node_id = response_data.get("node_id") or response_data.get("next_node_id") or current_node.id
-            actual_node = next(
-                (node for node in convo.nodes if node.id == actual_node_id),
-                current_node
-            )
+            actual_node = self._node_index(convo).get(actual_node_id, current_node)
             
             # Add bot response to history
-            # session.history.append({
-            #     "role": "assistant",
-            #     "content": response_data["message"],
-            #     "node_id": actual_node_id,
-            #     "timestamp": datetime.utcnow().isoformat()
-            # })
-            
-            
-            
-            session.history.append(ChatMessage(
-                    role="assistant",
-                    content=response_data["message"],
-                    node_id=actual_node_id,
-                    timestamp= datetime.utcnow().isoformat()
-                ).model_dump())
+            session.history.append(_mk_msg(
+                "assistant",
+                response_data["message"],
+                actual_node_id,
+                now
+            ))
             
             # Update current node if there's a next node or if node_id changed (chaining)
             if response_data.get("next_node_id"):
@@ -534,7 +1122,11 @@ class ConvoService:
             user_input: str,
             convo: ConvoDefinition
         ) -> Dict[str, Any]:
-            """Process an AI chat node."""
+            """Process an AI chat node.
+            
+            The user message and the returned reply are recorded in
+            ``session.history`` by the caller, not here.
+            """
             try:
                 if not node.ai_config:
                     raise APIServiceException(
@@ -543,41 +1135,22 @@ class ConvoService:
                     )
                 
                 ai_config = node.ai_config
+                now = datetime.utcnow()
+                
+                exit_pattern, exit_instructions = self._get_exit_matcher(ai_config)
                 
                 # Check for exit keywords
-                if user_input and ai_config.exit_keywords:
-                    user_input_lower = user_input.lower().strip()
-                    for keyword in ai_config.exit_keywords:
-                        if keyword.lower() in user_input_lower:
-                            # Exit AI chat mode
-                            if ai_config.exit_node_id:
-                                next_node = next(
-                                    (n for n in convo.nodes if n.id == ai_config.exit_node_id),
-                                    None
-                                )
-                                if next_node:
-                                    session.current_node_id = next_node.id
-                                    session.history.append(ChatMessage(
-                                        role="assistant",
-                                        content=next_node.message or "Exiting AI chat...",
-                                        node_id=next_node.id,
-                                        timestamp=datetime.utcnow()
-                                    ).model_dump())
-                                    
-                                    return {
-                                        "message": next_node.message or "Exiting AI chat...",
-                                        "node_id": next_node.id,
-                                        "node_type": next_node.type,
-                                        "requires_input": next_node.collect_input,
-                                        "input_type": next_node.input_type if next_node.collect_input else None,
-                                        "input_field": next_node.input_field if next_node.collect_input else None,
-                                        "completed": next_node.type == NodeType.END,
-                                        "options": []
-                                    }
+                if user_input and exit_pattern and exit_pattern.search(user_input):
+                    # Exit AI chat mode
+                    exit_response = self._get_exit_response(ai_config, convo)
+                    if exit_response:
+                        session.current_node_id = exit_response["node_id"]
+                        return {**exit_response, "options": []}
                 
                 # Get or create AI chat session for this convo session
                 ai_session_id = session.context.get("ai_session_id")
-                if not ai_session_id:
+                new_ai_session = not ai_session_id
+                if new_ai_session:
                     # Create new AI chat session
                     ai_session = await self.create_ai_chat_session(
                         AIChatSessionCreate(
@@ -594,35 +1167,30 @@ class ConvoService:
                     ai_session_id = ai_session.session_id
                     session.context["ai_session_id"] = ai_session_id
                 
-                # Build chat history
+                # Build chat history (a session created just now has none to read)
                 chat_history = []
-                if ai_config.include_chat_history:
+                if ai_config.include_chat_history and not new_ai_session:
                     chat_history = await self._get_ai_chat_history(
                         ai_session_id,
                         limit=ai_config.max_history_messages
                     )
                 
-                # Add system prompt if provided
-                query_context = {}
                 # if ai_config.system_prompt:
                 #     query_context["system_prompt"] = ai_config.system_prompt
                 
-                # Add context variables if specified
-                if ai_config.context_variables:
-                    for var in ai_config.context_variables:
-                        if var in session.context:
-                            query_context[var] = session.context[var]
-                
-                # Prepare the query
+                # Prepare the query, prepending any configured context variables that are set
                 query_text = user_input
-                if query_context:
-                    # Prepend context to query
-                    context_str = "\n".join([f"{k}: {v}" for k, v in query_context.items()])
+                var_set = ai_config._context_var_set
+                if var_set is None:
+                    var_set = ai_config._context_var_set = frozenset(ai_config.context_variables)
+                if var_set and not var_set.isdisjoint(session.context):
+                    context_str = "\n".join(
+                        f"{k}: {session.context[k]}"
+                        for k in ai_config.context_variables
+                        if k in session.context
+                    )
                     query_text = f"Context:\n{context_str}\n\nUser: {user_input}"
                 
-                # Save user message
-                await self._save_ai_chat_message(ai_session_id, "user", user_input, session.tenant_uid)
-                
                 # Call AI service
                 ai_response = await self._call_ai_service(
                     ai_session_id,
@@ -631,28 +1199,15 @@ class ConvoService:
                     ai_config
                 )
                 
-                # Save AI response
-                await self._save_ai_chat_message(ai_session_id, "assistant", ai_response, session.tenant_uid)
-                
-                # Add to session history
-                session.history.append(ChatMessage(
-                    role="user",
-                    content=user_input,
-                    node_id=node.id,
-                    timestamp=datetime.utcnow()
-                ).model_dump())
-                
-                session.history.append(ChatMessage(
-                    role="assistant",
-                    content=ai_response,
-                    node_id=node.id,
-                    timestamp=datetime.utcnow()
-                ).model_dump())
-                
-                # Build exit instructions
-                exit_instructions = ""
-                if ai_config.exit_keywords:
-                    exit_instructions = f"\n\n(Type '{ai_config.exit_keywords[0]}' to exit AI chat)"
+                # Persist the user/assistant pair in one round-trip, off the response path
+                _spawn_background(self._save_ai_chat_messages(
+                    ai_session_id,
+                    [
+                        {"role": "user", "content": user_input, "timestamp": now},
+                        {"role": "assistant", "content": ai_response, "timestamp": datetime.utcnow()}
+                    ],
+                    session.tenant_uid
+                ))
                 
                 # Check for Telegram Config
                 metadata = self._get_telegram_metadata(node, session)
@@ -679,6 +1234,114 @@ class ConvoService:
                     http_status_code=500
                 )
 
+    def _build_options(self, node: ConvoNode, context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Build the menu options for a node, rendering transition labels with context.
+        
+        When no label contains a placeholder the options are built once and
+        cached on the node; each call returns fresh copies.
+        """
+        if node.type != NodeType.MENU or not node.transitions:
+            return []
+        
+        if node._static_options is None:
+            labels = [t.label or f"Option {idx}" for idx, t in enumerate(node.transitions, 1)]
+            options = [
+                {
+                    "value": str(idx),
+                    "label": self._render_template(label, context),
+                    "target_node_id": transition.target_node_id
+                }
+                for idx, (label, transition) in enumerate(zip(labels, node.transitions), 1)
+            ]
+            if any("{{" in label for label in labels):
+                return options
+            node._static_options = tuple(options)
+        
+        return [dict(option) for option in node._static_options]
+
+    async def _get_ai_token(self) -> str:
+        """Return a valid access token for the AI service, logging in only when needed."""
+        global _ai_token, _ai_token_expires_at
+        if _ai_token and time.monotonic() < _ai_token_expires_at:
+            return _ai_token
+        
+        async with _ai_token_lock:
+            # Another request may have refreshed it while we waited
+            if _ai_token and time.monotonic() < _ai_token_expires_at:
+                return _ai_token
+            
+            login_response = await self._http.post(
+                f"{self.ai_service_url}/api/v1/auth/login",
+                json={
+                    "email": self.settings.ai_system_user,
+                    "password": self.settings.ai_system_password
+                },
+                headers={
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/json'
+                }
+            )
+            login_response.raise_for_status()
+            login_json = orjson.loads(login_response.content)
+            
+            _ai_token = login_json["access_token"]
+            ttl = float(
+                login_json.get("expires_in")
+                or _jwt_ttl(_ai_token)
+                or _AI_TOKEN_DEFAULT_TTL
+            )
+            # Refresh a little early so a token never expires mid-request
+            _ai_token_expires_at = time.monotonic() + max(ttl - 30.0, 0.0)
+            return _ai_token
+
+    def _node_index(self, convo: ConvoDefinition) -> Dict[str, ConvoNode]:
+        """Return the id -> node mapping for a convo, built once and cached on it."""
+        index = convo._node_index
+        if index is None:
+            index = convo._node_index = {n.id: n for n in convo.nodes}
+        return index
+
+    def _get_exit_matcher(self, ai_config: AINodeConfig) -> Tuple[Optional[re.Pattern], str]:
+        """Return the compiled exit-keyword pattern and exit hint for an AI node.
+        
+        Both are built once per config object and cached on it.
+        """
+        if ai_config._exit_pattern is None and ai_config.exit_keywords:
+            ai_config._exit_pattern = re.compile(
+                "|".join(re.escape(keyword) for keyword in ai_config.exit_keywords),
+                re.IGNORECASE
+            )
+            ai_config._exit_instructions = f"\n\n(Type '{ai_config.exit_keywords[0]}' to exit AI chat)"
+        return ai_config._exit_pattern, ai_config._exit_instructions
+
+    def _get_exit_response(
+        self,
+        ai_config: AINodeConfig,
+        convo: ConvoDefinition
+    ) -> Optional[Dict[str, Any]]:
+        """Return the response for leaving an AI node through its exit node.
+        
+        The response only depends on the exit node, so it is built once and
+        cached on the config; callers must copy it (with a fresh ``options``
+        list) before handing it out.
+        """
+        exit_response = ai_config._exit_response
+        if exit_response is None and ai_config.exit_node_id:
+            next_node = self._node_index(convo).get(ai_config.exit_node_id)
+            if next_node:
+                collect_input = next_node.collect_input
+                exit_response = ai_config._exit_response = {
+                    "message": next_node.message or "Exiting AI chat...",
+                    "node_id": next_node.id,
+                    "node_type": next_node.type,
+                    "requires_input": collect_input,
+                    "input_type": next_node.input_type if collect_input else None,
+                    "input_field": next_node.input_field if collect_input else None,
+                    "completed": next_node.type == NodeType.END,
+                    "options": []
+                }
+        return exit_response
+
     async def _process_process_media_node(
         self,
         session: ChatSession,
@@ -703,9 +1366,7 @@ class ConvoService:
             try:
                 # Create temp file
                 # Use suffix from url if possible to help with extension detection
-                suffix = ""
-                if "." in media_url.split("/")[-1]:
-                    suffix = "." + media_url.split("/")[-1].split(".")[-1]
+                suffix = os.path.splitext(urlparse(media_url).path)[1]
                     
                 with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
                     local_file_path = tmp_file.name
@@ -715,7 +1376,8 @@ class ConvoService:
                 # 1. Custom MinIO Config
                 if config.minio_config:
                     logger.info(f"Attempting download with custom MinIO config: {config.minio_config.endpoint}")
-                    download_success = self.storage_service.download_file(
+                    download_success = await asyncio.to_thread(
+                        self.storage_service.download_file,
                         media_url, 
                         local_file_path, 
                         minio_config=config.minio_config
@@ -724,11 +1386,15 @@ class ConvoService:
                 # 2. Direct URL
                 elif media_url.startswith(("http://", "https://")):
                     logger.info(f"Attempting direct HTTP download: {media_url}")
-                    async with httpx.AsyncClient() as client:
-                        resp = await client.get(media_url, timeout=30.0)
+                    async with self._http.stream("GET", media_url, timeout=30.0) as resp:
                         if resp.status_code == 200:
-                            with open(local_file_path, "wb") as f:
-                                f.write(resp.content)
+                            # Disk writes run in a worker thread so large files don't block the loop
+                            f = await asyncio.to_thread(open, local_file_path, "wb")
+                            try:
+                                async for chunk in resp.aiter_bytes(chunk_size=65536):
+                                    await asyncio.to_thread(f.write, chunk)
+                            finally:
+                                await asyncio.to_thread(f.close)
                             download_success = True
                         else:
                             logger.error(f"Failed to download media. Status: {resp.status_code}")
@@ -736,7 +1402,9 @@ class ConvoService:
                 # 3. Default MinIO
                 else:
                     logger.info(f"Attempting download with default MinIO config")
-                    download_success = self.storage_service.download_file(media_url, local_file_path)
+                    download_success = await asyncio.to_thread(
+                        self.storage_service.download_file, media_url, local_file_path
+                    )
                 
                 if download_success:
                     logger.info(f"Media downloaded successfully to {local_file_path}")
@@ -802,59 +1470,25 @@ class ConvoService:
                 logger.error(f"Error processing media: {e}", exc_info=True)
                 result_details = f"Error: {str(e)}"
             finally:
-                # Cleanup temp file
-                if local_file_path and os.path.exists(local_file_path):
-                    try:
-                        os.remove(local_file_path)
-                        # clean up context path
-                        session.context.pop("media_local_path", None)
-                    except Exception as e:
-                        logger.warning(f"Failed to delete temp file {local_file_path}: {e}")
-
-        # Determine next node based on transitions or default
-        next_node_id = None
-        if node.transitions:
-            # Check conditions if needed, otherwise take first
-            # For now taking first match or default
-            for transition in node.transitions:
-                 next_node_id = transition.target_node_id
-                 break
-        
-        # If no explicit transition found, check default_transition
-        if not next_node_id and node.default_transition:
-            next_node_id = node.default_transition
-
-        # Fallback to first transition if exists (legacy behavior?)
-        if not next_node_id and node.transitions:
-            next_node_id = node.transitions[0].target_node_id
-        
-        next_node = next(
-            (n for n in convo.nodes if n.id == next_node_id),
-            None
-        ) if next_node_id else None
+                # Cleanup temp file in the default executor, off the response path
+                if local_file_path:
+                    asyncio.get_running_loop().run_in_executor(None, _safe_unlink, local_file_path)
+                    session.context.pop("media_local_path", None)
+
+        # Determine next node: first transition, otherwise the default transition
+        transitions = node.transitions
+        next_node_id = (transitions[0].target_node_id if transitions else None) or node.default_transition
+        
+        next_node = self._node_index(convo).get(next_node_id) if next_node_id else None
 
         if next_node:
             session.current_node_id = next_node.id
-            return await self._chain_nodes(session, convo, next_node.id)
+            return await self._chain_nodes(session, convo, next_node.id, start_node=next_node)
         else:
             # If no next node, stay on current node or end
             message = self._render_template(node.message or f"Media processing complete: {result_details}", session.context)
             
-            # Check for Telegram Config
-            metadata = self._get_telegram_metadata(node, session)
-
-            return {
-                "message": message,
-                "node_id": node.id,
-                "next_node_id": None,
-                "node_type": node.type,
-                "requires_input": False, 
-                "input_type": None,
-                "input_field": None,
-                "completed": node.type == NodeType.END,
-                "options": [],
-                "metadata": metadata
-            }
+            return self._node_response(session, node, message, collect_input=False)
 
 
     async def _process_node(
@@ -866,6 +1500,8 @@ class ConvoService:
     ) -> Dict[str, Any]:
         """Process a node and return response data."""
         try:
+            now = datetime.utcnow()
+            
             # Check if this is an AI chat node
             if node.type == NodeType.AI_CHAT:
                 return await self._process_ai_chat_node(session, node, user_input, convo)
@@ -922,12 +1558,7 @@ class ConvoService:
 
             # Add user message to history if provided
             if user_input:
-                session.history.append(ChatMessage(
-                    role="user",
-                    content=user_input,
-                    node_id=node.id,
-                    timestamp=datetime.utcnow()
-                ).model_dump())
+                session.history.append(_mk_msg("user", user_input, node.id, now))
             
             # Render node message with context variables
             response_message = self._render_template(
@@ -953,86 +1584,30 @@ class ConvoService:
             # If we have a validation error, return it immediately
             if validation_error:
                 # Add validation error to history
-                session.history.append(ChatMessage(
-                    role="assistant",
-                    content=validation_error,
-                    node_id=node.id,
-                    timestamp=datetime.utcnow()
-                ).model_dump())
-                
-                # Build options for current node
-                options = []
-                if node.type == NodeType.MENU and node.transitions:
-                    for idx, transition in enumerate(node.transitions, 1):
-                        label = self._render_template(
-                            transition.label or f"Option {idx}",
-                            session.context
-                        )
-                        options.append({
-                            "value": str(idx),
-                            "label": label,
-                            "target_node_id": transition.target_node_id
-                        })
-                
-                # Check for Telegram Config for validation error
-                metadata = self._get_telegram_metadata(node, session)
-
-                return {
-                    "message": validation_error,
-                    "node_id": node.id,
-                    "next_node_id": None,
-                    "node_type": node.type,
-                    "requires_input": node.collect_input,
-                    "input_type": node.input_type if node.collect_input else None,
-                    "input_field": node.input_field if node.collect_input else None,
-                    "completed": False,
-                    "options": options,
-                    "metadata": metadata
-                }
+                session.history.append(_mk_msg("assistant", validation_error, node.id, now))
+                
+                return self._node_response(
+                    session,
+                    node,
+                    validation_error,
+                    self._build_options(node, session.context),
+                    completed=False
+                )
             
             # If we have a next node, transition to it (and chain if needed)
             if next_node_id:
                 return await self._chain_nodes(session, convo, next_node_id)
             else:
                 # No transition - stay on current node
-                session.history.append(ChatMessage(
-                    role="assistant",
-                    content=response_message,
-                    node_id=node.id,
-                    timestamp=datetime.utcnow()
-                ).model_dump())
-                
-                # Build options for current node
-                options = []
-                # (Existing logic for options...)
-                if node.type == NodeType.MENU and node.transitions:
-                    for idx, transition in enumerate(node.transitions, 1):
-                        # Render transition labels with context
-                        label = self._render_template(
-                            transition.label or f"Option {idx}",
-                            session.context
-                        )
-                        options.append({
-                            "value": str(idx),
-                            "label": label,
-                            "target_node_id": transition.target_node_id
-                        })
-                
-                # Check for Telegram Config
-                metadata = self._get_telegram_metadata(node, session)
-                
-                return {
-                    "message": response_message,
-                    "node_id": node.id,
-                    "next_node_id": None,
-                    "node_type": node.type,
-                    "requires_input": node.collect_input,
-                    "input_type": node.input_type if node.collect_input else None,
-                    "input_field": node.input_field if node.collect_input else None,
-                    "completed": False,
-                    "options": options,
-                    "metadata": metadata
-                }    
+                session.history.append(_mk_msg("assistant", response_message, node.id, now))
+                
+                return self._node_response(
+                    session,
+                    node,
+                    response_message,
+                    self._build_options(node, session.context),
+                    completed=False
+                )
 
                 
 
@@ -1061,27 +1636,10 @@ class ConvoService:
             )
             
             # Add initial bot message to history
-            session.history.append(ChatMessage(
-                role="assistant",
-                content=rendered_message,
-                node_id=node.id,
-                timestamp=datetime.utcnow()
-            ).model_dump())
+            session.history.append(_mk_msg("assistant", rendered_message, node.id))
             
             # Build options for the initial node
-            options = []
-            if node.type == NodeType.MENU and node.transitions:
-                for idx, transition in enumerate(node.transitions, 1):
-                    # Render transition labels with context
-                    label = self._render_template(
-                        transition.label or f"Option {idx}",
-                        session.context
-                    )
-                    options.append({
-                        "value": str(idx),
-                        "label": label,
-                        "target_node_id": transition.target_node_id
-                    })
+            options = self._build_options(node, session.context)
             
             # Execute node actions (if any)
             if node.actions:
@@ -1115,20 +1673,13 @@ class ConvoService:
                     initial_messages=[rendered_message]
                 )
 
-            # Check for Telegram Config
-            metadata = self._get_telegram_metadata(node, session)
-
-            return {
-                "message": rendered_message,
-                "node_id": node.id,
-                "node_type": node.type,
-                "requires_input": node.collect_input or (node.type == NodeType.MENU),
-                "input_type": node.input_type if node.collect_input else None,
-                "input_field": node.input_field if node.collect_input else None,
-                "completed": node.type == NodeType.END,
-                "options": options,
-                "metadata": metadata
-            }
+            return self._node_response(
+                session,
+                node,
+                rendered_message,
+                options,
+                requires_input=node.collect_input or node.type == NodeType.MENU
+            )
             
         except Exception as e:
             logger.error(f"Error processing initial node: {e}", exc_info=True)
@@ -1138,6 +1689,38 @@ class ConvoService:
                 http_status_code=500
             )
 
+    def _node_response(
+        self,
+        session: ChatSession,
+        node: ConvoNode,
+        message: str,
+        options: Optional[List[Dict[str, Any]]] = None,
+        collect_input: Optional[bool] = None,
+        requires_input: Optional[bool] = None,
+        completed: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """Build the response dict for a turn that stops at ``node``.
+        
+        ``collect_input``, ``requires_input`` and ``completed`` default to the
+        node's own settings when not given.
+        """
+        if collect_input is None:
+            collect_input = node.collect_input
+        node_type = node.type
+        
+        return {
+            "message": message,
+            "node_id": node.id,
+            "next_node_id": None,
+            "node_type": node_type,
+            "requires_input": collect_input if requires_input is None else requires_input,
+            "input_type": node.input_type if collect_input else None,
+            "input_field": node.input_field if collect_input else None,
+            "completed": node_type == NodeType.END if completed is None else completed,
+            "options": options or [],
+            "metadata": self._get_telegram_metadata(node, session)
+        }
+
     def _get_telegram_metadata(self, node: ConvoNode, session: ChatSession) -> Dict[str, Any]:
         """Extract telegram metadata from node config."""
         metadata = {}
@@ -1160,71 +1743,52 @@ class ConvoService:
         Replaces {{variable_name}} with values from context.
         Supports nested variables like {{user.name}}.
         """
-        if not template:
+        # Static messages and labels have no placeholders; skip the parse entirely
+        if not template or "{{" not in template:
             return template
             
         try:
-            import re
-            
-            # Find all template variables in the format {{variable_name}}
-            pattern = r'\{\{([^}]+)\}\}'
-            
-            def replace_variable(match):
-                # Parse variable for filters (format: var_name:key1,key2)
-                full_var_name = match.group(1).strip()
-                var_name = full_var_name
-                keys_to_extract = None
+            rendered = []
+            for segment in _parse_template(template):
+                if isinstance(segment, str):
+                    rendered.append(segment)
+                    continue
+                
+                path, keys_to_extract, placeholder = segment
                 
-                if ':' in full_var_name:
-                    parts = full_var_name.split(':')
-                    var_name = parts[0].strip()
-                    if len(parts) > 1:
-                        keys_to_extract = [k.strip() for k in parts[1].split(',')]
-
-                # Helper to resolve variable from context
-                def resolve_var(name, ctx):
-                    if '.' in name:
-                        parts = name.split('.')
-                        value = ctx
-                        for part in parts:
-                            if isinstance(value, dict) and part in value:
-                                value = value[part]
-                            else:
-                                return None
-                        return value
+                # Resolve (possibly nested) variable from context
+                value = context
+                for part in path:
+                    if isinstance(value, dict) and part in value:
+                        value = value[part]
                     else:
-                        return ctx.get(name)
-
-                value = resolve_var(var_name, context)
-
+                        value = None
+                        break
+                
                 if value is None:
                     # Variable not found, keep original placeholder
-                    logger.warning(f"Context variable '{var_name}' not found in session context")
-                    return match.group(0)
+                    logger.warning(f"Context variable '{'.'.join(path)}' not found in session context")
+                    rendered.append(placeholder)
                 
                 # Check if it's a list and we have keys to extract
-                if isinstance(value, list) and keys_to_extract:
+                elif isinstance(value, list) and keys_to_extract:
                     lines = []
                     for item in value:
                         if isinstance(item, dict):
                             # Extract values for specified keys
-                            item_values = []
-                            for key in keys_to_extract:
-                                if key in item:
-                                    item_values.append(str(item[key]))
-                            
+                            item_values = [str(item[key]) for key in keys_to_extract if key in item]
                             if item_values:
                                 lines.append(" - ".join(item_values))
-                    return "\n".join(lines)
+                    rendered.append("\n".join(lines))
                 
                 # Standard list handling
-                if isinstance(value, list):
-                    return "\n".join(str(item) for item in value)
-
-                return str(value)
+                elif isinstance(value, list):
+                    rendered.append("\n".join(str(item) for item in value))
+                
+                else:
+                    rendered.append(str(value))
             
-            rendered = re.sub(pattern, replace_variable, template)
-            return rendered
+            return "".join(rendered)
             
         except Exception as e:
             logger.error(f"Error rendering template: {e}")
@@ -1235,16 +1799,23 @@ class ConvoService:
         session: ChatSession,
         convo: ConvoDefinition,
         start_node_id: str,
-        initial_messages: List[str] = None
+        initial_messages: List[str] = None,
+        start_node: Optional[ConvoNode] = None
     ) -> Dict[str, Any]:
-        """Process a chain of nodes automatically."""
+        """Process a chain of nodes automatically.
+        
+        Callers that have already resolved the start node can pass it as
+        ``start_node`` to skip the first lookup.
+        """
         combined_messages = initial_messages or []
         next_node_id = start_node_id
+        nodes_by_id = self._node_index(convo)
+        now = datetime.utcnow()
         
         loop_counter = 0
         max_loops = 50
         
-        node = None
+        node = start_node
         
         while next_node_id:
             # Loop protection
@@ -1252,11 +1823,9 @@ class ConvoService:
             if loop_counter > max_loops:
                 logger.error(f"Infinite loop detected in node chaining: {next_node_id}")
                 break
-                
-            node = next(
-                (n for n in convo.nodes if n.id == next_node_id),
-                None
-            )
+            
+            if node is None or node.id != next_node_id:
+                node = nodes_by_id.get(next_node_id)
             
             if not node:
                 raise APIServiceException(
@@ -1267,7 +1836,6 @@ class ConvoService:
             # Update session to new node
             session.current_node_id = next_node_id
             
-            # Execute node actions (if any) BEFORE rendering message to ensure context is updated
             # Execute node actions (if any) BEFORE rendering message to ensure context is updated
             if node.actions:
                 jump_to_node_id = await self._execute_node_actions(session, node)
@@ -1291,12 +1859,7 @@ class ConvoService:
             )
             
             # Add bot response to history
-            session.history.append(ChatMessage(
-                role="assistant",
-                content=node_message,
-                node_id=node.id,
-                timestamp=datetime.utcnow()
-            ).model_dump())
+            session.history.append(_mk_msg("assistant", node_message, node.id, now))
             
             # Accumulate message
             combined_messages.append(node_message)
@@ -1332,34 +1895,12 @@ class ConvoService:
         # We stopped at `node`. Return response.
         response_message = "\n\n".join(combined_messages)
         
-        options = []
-        if node.type == NodeType.MENU and node.transitions:
-            for idx, transition in enumerate(node.transitions, 1):
-                label = self._render_template(
-                    transition.label or f"Option {idx}",
-                    session.context
-                )
-                options.append({
-                    "value": str(idx),
-                    "label": label,
-                    "target_node_id": transition.target_node_id
-                })
-        
-        # Check for Telegram Config
-        metadata = self._get_telegram_metadata(node, session)
-        
-        return {
-            "message": response_message,
-            "node_id": node.id,
-            "next_node_id": None,
-            "node_type": node.type,
-            "requires_input": node.collect_input,
-            "input_type": node.input_type if node.collect_input else None,
-            "input_field": node.input_field if node.collect_input else None,
-            "completed": node.type == NodeType.END,
-            "options": options,
-            "metadata": metadata
-        }
+        return self._node_response(
+            session,
+            node,
+            response_message,
+            self._build_options(node, session.context)
+        )
 
     async def _evaluate_transitions(
         self,
@@ -1367,75 +1908,36 @@ class ConvoService:
         node: ConvoNode,
         user_input: str
     ) -> Optional[str]:
-        """Evaluate node transitions and return the target node ID."""
-        user_input_stripped = str(user_input).strip()
-        
-        for idx, transition in enumerate(node.transitions):
-            # Check if user input matches the option number (1-indexed)
-            if user_input_stripped == str(idx + 1):
-                return transition.target_node_id
-            
-            # Check if transition has a label and user input matches it
-            if hasattr(transition, 'label') and transition.label:
-                if user_input_stripped.lower() == transition.label.lower():
-                    return transition.target_node_id
-            
-            # Check if transition has conditions
-            if hasattr(transition, 'condition') and transition.condition:
-                condition = transition.condition
-                
-                # Handle dict-based conditions
-                if isinstance(condition, dict):
-                    condition_type = condition.get("type")
-                    field = condition.get("field")
-                    value = condition.get("value")
-                    
-                    if condition_type == "equals":
-                        # Check if user input matches the expected value
-                        if field and field in session.context:
-                            if str(session.context[field]) == str(value):
-                                return transition.target_node_id
-                        # Also check direct user input match
-                        elif user_input_stripped == str(value):
-                            return transition.target_node_id
-                            
-                    elif condition_type == "contains":
-                        if field and field in session.context:
-                            if str(value).lower() in str(session.context[field]).lower():
-                                return transition.target_node_id
-                        elif str(value).lower() in user_input_stripped.lower():
-                            return transition.target_node_id
-                            
-                    elif condition_type == "greater_than":
-                        try:
-                            input_val = float(session.context.get(field, user_input_stripped))
-                            if input_val > float(value):
-                                return transition.target_node_id
-                        except (ValueError, TypeError):
-                            pass
-                            
-                    elif condition_type == "less_than":
-                        try:
-                            input_val = float(session.context.get(field, user_input_stripped))
-                            if input_val < float(value):
-                                return transition.target_node_id
-                        except (ValueError, TypeError):
-                            pass
-                            
-                    elif condition_type == "in_list":
-                        if isinstance(value, list):
-                            if field and field in session.context:
-                                if session.context[field] in value:
-                                    return transition.target_node_id
-                            elif user_input_stripped in value:
-                                return transition.target_node_id
-                                
-                # Handle string-based conditions (simple expressions)
-                elif isinstance(condition, str):
-                    if self._evaluate_condition(condition, session.context, user_input_stripped):
-                        return transition.target_node_id
+        """Evaluate node transitions and return the target node ID.
         
-        return None
+        Matches the input against option numbers (1-indexed) and transition
+        labels (case-insensitive); the first transition in order wins.
+        """
+        return self._transition_lookup(node).get(str(user_input).strip().lower())
+    
+    def _transition_lookup(self, node: ConvoNode) -> Dict[str, str]:
+        """Return the option number / lowercased label -> target node id map for a node.
+        
+        Labels are lowercased once when the map is built and cached on the node.
+        """
+        lookup = node._transition_lookup
+        if lookup is None:
+            lookup = {}
+            for idx, transition in enumerate(node.transitions, 1):
+                lookup.setdefault(str(idx), transition.target_node_id)
+                if transition.label:
+                    lookup.setdefault(transition.label.lower(), transition.target_node_id)
+            node._transition_lookup = lookup
+        return lookup
+    
+    def _sorted_transitions(self, node: ConvoNode) -> tuple:
+        """Return a node's transitions by descending priority, sorted once and cached on it."""
+        ordered = node._sorted_transitions
+        if ordered is None:
+            ordered = node._sorted_transitions = tuple(
+                sorted(node.transitions, key=_BY_PRIORITY, reverse=True)
+            )
+        return ordered
     
     def _evaluate_condition(
         self,
@@ -1453,7 +1955,7 @@ class ConvoService:
                 value_to_check = user_input
                 if condition.field:
                     # Extract from context if field is specified
-                    found, val = self._find_value_in_nested_dict(context, condition.field)
+                    found, val = self._lookup_value(context, condition.field)
                     if found:
                         value_to_check = str(val)
                 
@@ -1481,8 +1983,8 @@ class ConvoService:
             if isinstance(condition, str):
                 # Add user_input to context for evaluation
                 eval_context = {**context, "user_input": user_input}
-                # WARNING: Using eval is dangerous
-                return eval(condition, {"__builtins__": {}}, eval_context)
+                # Compiled once per condition; only whitelisted expression nodes are accepted
+                return eval(_compile_condition(condition), {"__builtins__": {}}, eval_context)
                 
             return False
         except Exception as e:
@@ -1498,7 +2000,12 @@ class ConvoService:
         Execute actions defined in a node.
         Returns: Target node ID if a jump is requested, None otherwise.
         """
-        for action in node.actions:
+        for step in self._group_node_actions(node.actions):
+            if isinstance(step, list):
+                await self._execute_api_actions_concurrently(session, step)
+                continue
+            
+            action = step
             try:
                 if action.type == "save_to_context":
                     # Save data to session context
@@ -1530,6 +2037,76 @@ class ConvoService:
         
         return None
     
+    def _group_node_actions(self, actions: List[NodeAction]) -> List[Union[NodeAction, List[NodeAction]]]:
+        """Split node actions into sequential steps.
+        
+        Consecutive api_call actions that cannot jump (no on_success/on_failure),
+        don't read any other batch member's outputs and don't write the same
+        outputs are grouped into a list so they can run concurrently; every
+        other action is its own step, preserving the original order.
+        """
+        steps: List[Union[NodeAction, List[NodeAction]]] = []
+        batch: List[NodeAction] = []
+        batch_inputs: set = set()
+        batch_outputs: set = set()
+        
+        def flush():
+            if len(batch) > 1:
+                steps.append(list(batch))
+            else:
+                steps.extend(batch)
+            batch.clear()
+            batch_inputs.clear()
+            batch_outputs.clear()
+        
+        for action in actions:
+            api_config = action.api_action
+            independent = (
+                action.type == "api_call"
+                and api_config is not None
+                and not action.on_success
+                and not action.on_failure
+            )
+            if not independent:
+                flush()
+                steps.append(action)
+                continue
+            
+            inputs = set(api_config.input)
+            outputs = set(api_config.output)
+            if batch_outputs & inputs or batch_outputs & outputs or batch_inputs & outputs:
+                flush()
+            batch.append(action)
+            batch_inputs |= inputs
+            batch_outputs |= outputs
+        
+        flush()
+        return steps
+
+    async def _execute_api_actions_concurrently(
+        self,
+        session: ChatSession,
+        actions: List[NodeAction]
+    ) -> None:
+        """Run independent API actions concurrently.
+        
+        Only the HTTP calls overlap; their results are applied to the context
+        in action order afterwards, so the session ends up exactly as if the
+        actions had run one after another.
+        """
+        for action in actions:
+            self._clear_api_action_outputs(session, action.api_action)
+        await self._update_session(session)
+        
+        results = await asyncio.gather(
+            *(self._call_api_action(session, action.api_action) for action in actions)
+        )
+        for action, (output_values, error_msg) in zip(actions, results):
+            if output_values is not None or error_msg is not None:
+                self._apply_api_action_result(session, action.api_action, output_values, error_msg)
+        
+        await self._update_session(session)
+
     async def _execute_api_action(
         self,
         session: ChatSession,
@@ -1542,15 +2119,67 @@ class ConvoService:
         
         api_config = action.api_action
         
-        # Clear output variables and previous error
+        # Clear output variables and previous error, and persist the cleared state
+        self._clear_api_action_outputs(session, api_config)
+        await self._update_session(session)
+        
+        output_values, error_msg = await self._call_api_action(session, api_config)
+        if output_values is None and error_msg is None:
+            return None
+        
+        self._apply_api_action_result(session, api_config, output_values, error_msg)
+        await self._update_session(session)
+        
+        if error_msg is not None:
+            if action.on_failure:
+                logger.info(f"Action failed, jumping to node: {action.on_failure}")
+                return action.on_failure
+            return None
+        
+        # Mark action as successful
+        if action.on_success:
+            logger.info(f"Action successful, jumping to node: {action.on_success}")
+            return action.on_success
+        
+        return None
+
+    def _clear_api_action_outputs(self, session: ChatSession, api_config: ApiAction) -> None:
+        """Reset an API action's output variables and the last API error."""
         for output_var in api_config.output:
             session.context[output_var] = None
         session.context["api_error"] = None
+
+    def _apply_api_action_result(
+        self,
+        session: ChatSession,
+        api_config: ApiAction,
+        output_values: Optional[Dict[str, Any]],
+        error_msg: Optional[str]
+    ) -> None:
+        """Store an API action's outputs, or its error, in the session context."""
+        session.context["api_error"] = error_msg
+        if error_msg is not None:
+            return
         
-        # Save session to persist cleared state
-        await self._update_session(session)
+        for output_var in api_config.output:
+            if output_var in output_values:
+                value = output_values[output_var]
+                session.context[output_var] = value
+                logger.debug("Stored '%s' in session context: %s", output_var, value)
+            else:
+                logger.warning(f"Output variable '{output_var}' not found in API response")
 
+    async def _call_api_action(
+        self,
+        session: ChatSession,
+        api_config: ApiAction
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Make an API action's HTTP call without modifying the session.
         
+        Returns the output values found in the response and ``None``, or
+        ``None`` and an error message if the call failed. Both are ``None``
+        when the call was not made.
+        """
         try:
             # Prepare input data from session context
             input_data = {}
@@ -1565,101 +2194,51 @@ class ConvoService:
                 user = await self.auth_database["users"].find_one({"user_id": session.user_id})
                 if user and user.get("metadata"):
                     input_data["user_metadata"] = user.get("metadata")
-
-            
             
-            
-            # Prepare headers
-            headers = api_config.headers or {}
+            # Prepare headers (copied: the convo definition is shared across requests)
+            headers = dict(api_config.headers or {})
             if "Content-Type" not in headers:
                 headers["Content-Type"] = "application/json"
             
             # Make the API call
-            async with httpx.AsyncClient(timeout=api_config.timeout) as client:
-                logger.info(f"Making {api_config.method} request to {api_config.url}")
-                logger.debug(f"Request data: {input_data}")
-                
-                if api_config.method.upper() == "GET":
-                    response = await client.get(
-                        api_config.url,
-                        params=input_data,
-                        headers=headers
-                    )
-                elif api_config.method.upper() == "POST":
-                    response = await client.post(
-                        api_config.url,
-                        json=input_data,
-                        headers=headers
-                    )
-                elif api_config.method.upper() == "PUT":
-                    response = await client.put(
-                        api_config.url,
-                        json=input_data,
-                        headers=headers
-                    )
-                elif api_config.method.upper() == "DELETE":
-                    response = await client.delete(
-                        api_config.url,
-                        json=input_data,
-                        headers=headers
-                    )
-                else:
-                    logger.error(f"Unsupported HTTP method: {api_config.method}")
-                    return
-                
-                # Check response status
-                response.raise_for_status()
-                
-                # Parse response
-                response_data = response.json()
-                logger.info(f"API call successful: {response.status_code}")
-                logger.debug(f"Response data: {response_data}")
-                
-                # Store output variables in session context
-                for output_var in api_config.output:
-                    found, value = self._find_value_in_nested_dict(response_data, output_var)
-                    if found:
-                        session.context[output_var] = value
-                        logger.debug(f"Stored '{output_var}' in session context: {value}")
-                    else:
-                        logger.warning(f"Output variable '{output_var}' not found in API response")
-                
-                # Save session to persist output variables
-                await self._update_session(session)
-                                
-                # Mark action as successful
-                if action.on_success:
-                    logger.info(f"Action successful, jumping to node: {action.on_success}")
-                    return action.on_success
+            method = api_config.method.upper()
+            if method not in ("GET", "POST", "PUT", "DELETE"):
+                logger.error(f"Unsupported HTTP method: {api_config.method}")
+                return None, None
+            
+            logger.info(f"Making {api_config.method} request to {api_config.url}")
+            logger.debug("Request data: %s", input_data)
+            
+            response = await self._http.request(
+                method,
+                api_config.url,
+                params=input_data if method == "GET" else None,
+                json=input_data if method != "GET" else None,
+                headers=headers,
+                timeout=api_config.timeout
+            )
+            
+            # Check response status
+            response.raise_for_status()
+            
+            # Parse response
+            response_data = orjson.loads(response.content)
+            logger.info(f"API call successful: {response.status_code}")
+            logger.debug("Response data: %s", response_data)
+            
+            return self._lookup_values(response_data, api_config.output), None
                 
-                return None
-                    
         except httpx.HTTPStatusError as e:
             error_msg = f"API call failed with status {e.response.status_code}: {e}"
             logger.error(error_msg)
-            session.context["api_error"] = error_msg
-            await self._update_session(session)
-            if action.on_failure:
-                logger.info(f"Action failed, jumping to node: {action.on_failure}")
-                return action.on_failure
         except httpx.RequestError as e:
             error_msg = f"API request error: {e}"
             logger.error(error_msg)
-            session.context["api_error"] = error_msg
-            await self._update_session(session)
-            if action.on_failure:
-                logger.info(f"Action failed, jumping to node: {action.on_failure}")
-                return action.on_failure
         except Exception as e:
             error_msg = f"Unexpected error during API call: {e}"
             logger.error(error_msg, exc_info=True)
-            session.context["api_error"] = error_msg
-            await self._update_session(session)
-            if action.on_failure:
-                logger.info(f"Action failed, jumping to node: {action.on_failure}")
-                return action.on_failure
         
-        return None
+        return None, error_msg
 
     async def _process_media_service_action(
         self,
@@ -1672,7 +2251,6 @@ class ConvoService:
         Execute a service action with media upload.
         Returns a summary string of the result.
         """
-        import os
         try:
             # Prepare input data (form fields)
             input_data = {}
@@ -1704,61 +2282,52 @@ class ConvoService:
             
             input_data["media_type"] = media_type
 
-            # headers
-            headers = api_config.headers or {}
-            # Do NOT set Content-Type to application/json, httpx will set multipart/form-data with boundary
-            if "Content-Type" in headers and "json" in headers["Content-Type"]:
-                del headers["Content-Type"]
+            # The multipart body sets its own Content-Type (with boundary) and
+            # Content-Length; copy the rest so the shared config is not mutated
+            headers = {
+                k: v for k, v in (api_config.headers or {}).items()
+                if k.lower() not in ("content-type", "content-length")
+            }
             
             # Prepare file
             filename = os.path.basename(file_path)
             
-            # Using context manager for file
-            async with httpx.AsyncClient(timeout=api_config.timeout or 60.0) as client:
-                logger.info(f"Uploading media to {api_config.url} ({api_config.method})")
-                
-                with open(file_path, 'rb') as f:
-                    # 'files' dict: key is field name, value is (filename, file_object, content_type)
-                    files = {
-                        'file': (filename, f, 'application/octet-stream') 
-                    }
-                    
-                    if api_config.method.upper() == "POST":
-                        response = await client.post(
-                            api_config.url,
-                            data=input_data,
-                            files=files,
-                            headers=headers
-                        )
-                    elif api_config.method.upper() == "PUT":
-                        response = await client.put(
-                            api_config.url,
-                            data=input_data,
-                            files=files,
-                            headers=headers
-                        )
-                    else:
-                         logger.warning(f"Method {api_config.method} might not support file upload body.")
-                         raise APIServiceException(f"Method {api_config.method} not supported for media upload")
+            method = api_config.method.upper()
+            if method not in ("POST", "PUT"):
+                logger.warning(f"Method {api_config.method} might not support file upload body.")
+                raise APIServiceException(f"Method {api_config.method} not supported for media upload")
+            
+            logger.info(f"Uploading media to {api_config.url} ({api_config.method})")
+            
+            # Multipart body is streamed from disk in chunks read off the event loop
+            upload_headers, body = _multipart_file_upload(input_data, "file", filename, file_path)
+            response = await self._http.request(
+                method,
+                api_config.url,
+                content=body,
+                headers={**upload_headers, **headers},
+                timeout=api_config.timeout or 60.0
+            )
 
-                response.raise_for_status()
+            response.raise_for_status()
 
-                response_data = response.json()
-                logger.debug(f"API output: {api_config.output}")
-                logger.debug(f"API call successful: {response.status_code}")
-                logger.debug(f"Response data: {response_data}")
-                
-                # Store output variables in session context
-                for output_var in api_config.output:
-                    found, value = self._find_value_in_nested_dict(response_data, output_var)
-                    if found:
-                        session.context[output_var] = value
-                        logger.debug(f"Stored '{output_var}' in session context: {value}")
-                    else:
-                        logger.warning(f"Output variable '{output_var}' not found in API response")
+            response_data = orjson.loads(response.content)
+            logger.debug("API output: %s", api_config.output)
+            logger.debug("API call successful: %s", response.status_code)
+            logger.debug("Response data: %s", response_data)
+            
+            # Store output variables in session context
+            output_values = self._lookup_values(response_data, api_config.output)
+            for output_var in api_config.output:
+                if output_var in output_values:
+                    value = output_values[output_var]
+                    session.context[output_var] = value
+                    logger.debug("Stored '%s' in session context: %s", output_var, value)
+                else:
+                    logger.warning(f"Output variable '{output_var}' not found in API response")
 
-                return f"Success {response.status_code}"
-            
+            return f"Success {response.status_code}"
+        
         except Exception as e:
             logger.error(f"Error in media service action: {e}", exc_info=True)
             raise APIServiceException(f"Service upload failed: {str(e)}")
@@ -1771,11 +2340,9 @@ class ConvoService:
         media_url: str
     ) -> None:
         """Send an email with the media attachment."""
-        import smtplib
         from email.mime.multipart import MIMEMultipart
         from email.mime.text import MIMEText
         from email.mime.base import MIMEBase
-        from email import encoders
         
         try:
             # Render templates
@@ -1791,29 +2358,19 @@ class ConvoService:
             msg.attach(MIMEText(body, 'plain'))
             
             # Attach file
-            filename = media_url.split("/")[-1]
-            if not filename:
-                filename = "attachment"
-                
-            with open(file_path, "rb") as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f"attachment; filename= {filename}",
-                )
-                msg.attach(part)
-            
-            # Connect to SMTP server
-            # Note: synchronous smtplib is used here. For high throughput, use aiosmtplib.
-            # Assuming low volume for now or wrap in run_in_executor if needed.
-            server = smtplib.SMTP(config.smtp_server, config.smtp_port)
-            server.starttls()
-            server.login(config.username, config.password)
-            text = msg.as_string()
-            server.sendmail(config.from_email, to_email, text)
-            server.quit()
+            filename = os.path.basename(media_url) or "attachment"
+            
+            part = MIMEBase('application', 'octet-stream')
+            part.set_payload(await asyncio.to_thread(_read_file_base64_lines, file_path))
+            part['Content-Transfer-Encoding'] = 'base64'
+            part.add_header(
+                'Content-Disposition',
+                f"attachment; filename= {filename}",
+            )
+            msg.attach(part)
+            
+            # SMTP is blocking: send from a worker thread over a reused connection
+            await asyncio.to_thread(_smtp_send, config, to_email, msg)
             
             logger.info(f"Email sent successfully to {to_email}")
             
@@ -1828,31 +2385,15 @@ class ConvoService:
         file_path: str
     ) -> str:
         """Process media with AI service."""
-        import base64
-        
         try:
-            # Encode image to base64
-            with open(file_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            
             # Authenticate with AI Service
-            login_url = f"{self.ai_service_url}/api/v1/auth/login"
-            login_payload = {
-                "email": self.settings.ai_system_user,
-                "password": self.settings.ai_system_password
-            }
-            
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                login_response = await client.post(login_url, json=login_payload)
-                login_response.raise_for_status()
-                token = login_response.json()["access_token"]
+            token = await self._get_ai_token()
             
             # Prepare payload
             query = self._render_template(config.query, session.context)
             
             payload = {
                 "query": query,
-                "image_base64": encoded_string,
                 "system_message": config.system_message,
                 "session_id": session.session_id,
                 "max_documents": 10,
@@ -1879,15 +2420,25 @@ class ConvoService:
                 'Authorization': f"Bearer {token}"
             }
             
-            async with httpx.AsyncClient(timeout=120.0) as client: # Longer timeout for image processing
-                response = await client.post(url, json=payload, headers=headers)
-                
-                if response.status_code != 200:
-                    logger.error(f"AI service error: {response.status_code} - {response.text}")
-                    raise APIServiceException(f"AI service returned error: {response.text}")
-                
-                result = response.json()
-                return result.get("answer", "")
+            # The image is base64-encoded from disk while the body is sent
+            body_headers, body = _json_with_base64_file(payload, "image_base64", file_path)
+            
+            # Longer timeout for image processing
+            response = await self._http.post(
+                url,
+                content=body,
+                headers={**headers, **body_headers},
+                timeout=120.0
+            )
+            
+            if response.status_code == 401:
+                invalidate_ai_token(token)
+            if response.status_code != 200:
+                logger.error(f"AI service error: {response.status_code} - {response.text}")
+                raise APIServiceException(f"AI service returned error: {response.text}")
+            
+            result = orjson.loads(response.content)
+            return result.get("answer", "")
                 
         except Exception as e:
             logger.error(f"Error calling AI service for media: {e}")
@@ -1898,162 +2449,131 @@ class ConvoService:
         validations: List[Any]
     ) -> tuple[bool, Optional[str]]:
         """Validate user input against validation rules."""
-        import re
+        stripped = user_input.strip()
         
         for validation in validations:
             # Handle ValidationRule objects
             if hasattr(validation, 'type'):
-                validation_type = validation.type
                 params = validation.params if hasattr(validation, 'params') else {}
                 error_message = validation.error_message if hasattr(validation, 'error_message') else "Validation failed"
                 
-                # Required validation
-                if validation_type == "required":
-                    if not user_input or not user_input.strip():
-                        return False, error_message or "This field is required."
-                
-                # Minimum length validation
-                elif validation_type == "min_length":
-                    min_len = params.get("value", params.get("min", 0))
-                    if len(user_input) < min_len:
-                        return False, error_message or f"Input must be at least {min_len} characters."
-                
-                # Maximum length validation
-                elif validation_type == "max_length":
-                    max_len = params.get("value", params.get("max", 1000))
-                    if len(user_input) > max_len:
-                        return False, error_message or f"Input must not exceed {max_len} characters."
-                
-                # Length range validation
-                elif validation_type == "length":
-                    min_len = params.get("min", 0)
-                    max_len = params.get("max", float('inf'))
-                    if len(user_input) < min_len or len(user_input) > max_len:
-                        return False, error_message or f"Input must be between {min_len} and {max_len} characters."
-                
-                # Email validation
-                elif validation_type == "email":
-                    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                    if not re.match(email_pattern, user_input.strip()):
-                        return False, error_message or "Please enter a valid email address."
-                
-                # Phone validation
-                elif validation_type == "phone":
-                    # Remove common phone number characters
-                    phone_digits = re.sub(r'[\s\-\(\)\+]', '', user_input)
-                    # Check if it's a valid phone number (10-15 digits)
-                    if not re.match(r'^\d{10,15}$', phone_digits):
-                        return False, error_message or "Please enter a valid phone number."
-                
-                # Number validation
-                elif validation_type == "number":
-                    try:
-                        float(user_input.strip())
-                    except ValueError:
-                        return False, error_message or "Please enter a valid number."
-                
-                # Integer validation
-                elif validation_type == "integer":
-                    try:
-                        int(user_input.strip())
-                    except ValueError:
-                        return False, error_message or "Please enter a valid integer."
-                
-                # Regex pattern validation
-                elif validation_type == "regex":
-                    pattern = params.get("pattern", params.get("value"))
-                    if pattern and not re.match(pattern, user_input):
-                        return False, error_message or "Input does not match the required format."
-                
-                # Range validation (for numbers)
-                elif validation_type == "range":
-                    try:
-                        value = float(user_input.strip())
-                        min_val = params.get("min", float('-inf'))
-                        max_val = params.get("max", float('inf'))
-                        if value < min_val or value > max_val:
-                            return False, error_message or f"Value must be between {min_val} and {max_val}."
-                    except ValueError:
-                        return False, error_message or "Please enter a valid number."
-                
-                # URL validation
-                elif validation_type == "url":
-                    url_pattern = r'^https?://[^\s/$.?#].[^\s]*$'
-                    if not re.match(url_pattern, user_input.strip(), re.IGNORECASE):
-                        return False, error_message or "Please enter a valid URL."
-                
-                # Date validation
-                elif validation_type == "date":
-                    date_format = params.get("format", "%Y-%m-%d")
-                    try:
-                        from datetime import datetime
-                        datetime.strptime(user_input.strip(), date_format)
-                    except ValueError:
-                        return False, error_message or f"Please enter a valid date in format {date_format}."
-                
-                # Alphanumeric validation
-                elif validation_type == "alphanumeric":
-                    if not re.match(r'^[a-zA-Z0-9]+$', user_input):
-                        return False, error_message or "Input must contain only letters and numbers."
-                
-                # Alpha (letters only) validation
-                elif validation_type == "alpha":
-                    if not re.match(r'^[a-zA-Z]+$', user_input):
-                        return False, error_message or "Input must contain only letters."
-                
-                # In list validation
-                elif validation_type == "in_list":
-                    allowed_values = params.get("values", params.get("list", []))
-                    if user_input.strip() not in allowed_values:
-                        return False, error_message or f"Input must be one of: {', '.join(allowed_values)}."
-                
-                # Not in list validation
-                elif validation_type == "not_in_list":
-                    forbidden_values = params.get("values", params.get("list", []))
-                    if user_input.strip() in forbidden_values:
-                        return False, error_message or "This value is not allowed."
+                validator = _VALIDATORS.get(validation.type)
+                if validator is None:
+                    logger.warning(f"Unknown validation type: {validation.type}")
+                    continue
                 
-                # Custom validation (if needed)
-                else:
-                    logger.warning(f"Unknown validation type: {validation_type}")
+                error = validator(user_input, stripped, params or {}, error_message)
+                if error is not None:
+                    return False, error
         
         # All validations passed
         return True, None
 
+    def _lookup_value(self, data: Any, key: str) -> Tuple[bool, Any]:
+        """Resolve a condition field or API output name against ``data``.
+        
+        Dotted names ("user.name") are walked directly as a path; anything
+        not found that way falls back to the nested key search.
+        """
+        path = _compile_path(key)
+        if len(path) > 1:
+            found, value = _walk_path(data, path)
+            if found:
+                return True, value
+        return self._find_value_in_nested_dict(data, key)
+
+    def _lookup_values(self, data: Any, keys: List[str]) -> Dict[str, Any]:
+        """Resolve several API output names against ``data`` at once.
+        
+        Same rules as ``_lookup_value``, but every name that needs the nested
+        key search shares a single walk of ``data``. Names that are not found
+        are left out of the result.
+        """
+        found_values: Dict[str, Any] = {}
+        pending = set()
+        for key in keys:
+            path = _compile_path(key)
+            if len(path) > 1:
+                found, value = _walk_path(data, path)
+                if found:
+                    found_values[key] = value
+                    continue
+            pending.add(key)
+        if pending:
+            found_values.update(self._find_values_in_nested_dict(data, pending))
+        return found_values
+
     def _find_value_in_nested_dict(self, data: Any, key: str) -> tuple[bool, Any]:
         """
-        Recursively search for a key in nested dictionaries and lists.
+        Search for a key in nested dictionaries and lists.
         Returns: (found: bool, value: Any)
         """
-        if isinstance(data, dict):
-            # Check if key exists at current level
-            if key in data:
-                return True, data[key]
-            
-            # Search in nested dictionaries
-            for value in data.values():
-                found, result = self._find_value_in_nested_dict(value, key)
-                if found:
-                    return True, result
-        
-        elif isinstance(data, list):
-            # Search in list items
-            for item in data:
-                found, result = self._find_value_in_nested_dict(item, key)
-                if found:
-                    return True, result
+        # Explicit depth-first walk, visiting children in document order
+        stack = [data]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, dict):
+                # Check if key exists at current level
+                value = current.get(key, _MISSING)
+                if value is not _MISSING:
+                    return True, value
+                stack.extend(reversed(current.values()))
+            elif isinstance(current, list):
+                stack.extend(reversed(current))
         
         return False, None
 
+    def _find_values_in_nested_dict(self, data: Any, keys: set) -> Dict[str, Any]:
+        """
+        Search for several keys in nested dictionaries and lists in one walk.
+        Each key gets the same value ``_find_value_in_nested_dict`` would return.
+        """
+        remaining = set(keys)
+        found_values: Dict[str, Any] = {}
+        stack = [data]
+        while stack and remaining:
+            current = stack.pop()
+            if isinstance(current, dict):
+                for key in remaining.intersection(current):
+                    found_values[key] = current[key]
+                remaining.difference_update(found_values)
+                stack.extend(reversed(current.values()))
+            elif isinstance(current, list):
+                stack.extend(reversed(current))
+        return found_values
+
     async def _update_session(self, session: ChatSession) -> None:
-        """Update session in database."""
+        """Update session in database.
+        
+        Only history entries appended since the last write are pushed, so the
+        payload does not grow with the length of the conversation.
+        """
         try:
-            session_dict = session.model_dump()
-            session_dict["updated_at"] = datetime.utcnow()
-            await self.sessions_collection.replace_one(
+            now = datetime.utcnow()
+            session.last_activity = now
+            
+            set_fields = {
+                "current_node_id": session.current_node_id,
+                "context": session.context,
+                "completed": session.completed,
+                "last_activity": now,
+                "updated_at": now
+            }
+            update = {"$set": set_fields}
+            
+            flushed = session._history_flushed
+            history_len = len(session.history)
+            if flushed is None or flushed > history_len:
+                # History was replaced (e.g. restart) or never loaded from DB
+                set_fields["history"] = session.history
+            elif history_len > flushed:
+                update["$push"] = {"history": {"$each": session.history[flushed:]}}
+            
+            await self.sessions_collection.update_one(
                 {"session_id": session.session_id},
-                session_dict
+                update
             )
+            session._history_flushed = history_len
         except Exception as e:
             logger.error(f"Error updating session: {e}")
             raise APIServiceException(
@@ -2176,12 +2696,11 @@ class ConvoService:
             except ValueError:
                 pass
             
-            # Try to match by label (case-insensitive)
-            user_input_lower = user_input_clean.lower()
-            for transition in node.transitions:
-                if transition.label and user_input_lower == transition.label.lower():
-                    logger.info(f"Matched label '{transition.label}' -> {transition.target_node_id}")
-                    return transition.target_node_id, None
+            # Try to match by label (case-insensitive); option numbers were handled above
+            target_node_id = self._transition_lookup(node).get(user_input_clean.lower())
+            if target_node_id:
+                logger.info(f"Matched label '{user_input_clean}' -> {target_node_id}")
+                return target_node_id, None
             
             # No match found via index or label
             # Continue to conditional checks instead of returning error immediately
@@ -2189,7 +2708,7 @@ class ConvoService:
 
         
         # Handle conditional transitions
-        for transition in sorted(node.transitions, key=lambda t: t.priority, reverse=True):
+        for transition in self._sorted_transitions(node):
             if not transition.condition:
                 # Unconditional transition
                 return transition.target_node_id, None
@@ -2224,6 +2743,7 @@ class ConvoService:
                 )
             
             session = ChatSession(**session_data)
+            session._history_flushed = len(session.history)
             
             # Get convo
             convo = await self.get_convo(session.convo_id)
@@ -2234,10 +2754,7 @@ class ConvoService:
                 )
             
             # Get current node
-            current_node = next(
-                (node for node in convo.nodes if node.id == session.current_node_id),
-                None
-            )
+            current_node = self._node_index(convo).get(session.current_node_id)
             
             if not current_node:
                 raise APIServiceException(
@@ -2253,19 +2770,7 @@ class ConvoService:
             response_data = await self._process_node(session, current_node, message, convo)
             
             # Update session in database
-            session.last_activity = datetime.utcnow()
-            await self.sessions_collection.update_one(
-                {"session_id": session_id},
-                {
-                    "$set": {
-                        "current_node_id": session.current_node_id,
-                        "context": session.context,
-                        "history": [msg.model_dump() for msg in session.history],
-                        "last_activity": session.last_activity,
-                        "updated_at": datetime.utcnow()
-                    }
-                }
-            )
+            await self._update_session(session)
             
             logger.info(f"After processing: current_node_id = {session.current_node_id}")
             
@@ -2307,17 +2812,18 @@ class ConvoService:
     ) -> Optional[Dict[str, Any]]:
         """Handle special navigation commands like 'menu', 'back', 'restart'."""
         command = user_input.strip().lower()
+        if command not in _NAVIGATION_COMMANDS:
+            return None
         
-        if command in ["menu", "main menu", "main","hello","hi"]:
-            # Return to start node
+        if command in _MENU_COMMANDS:
             # Return to start node
             start_node = None
             if convo.start_node_id:
-                start_node = next((n for n in convo.nodes if n.id == convo.start_node_id), None)
+                start_node = self._node_index(convo).get(convo.start_node_id)
             
             if not start_node:
                 start_node = next(
-                    (node for node in convo.nodes if node.type == NodeType.START or node.type == NodeType.MENU),
+                    (node for node in convo.nodes if node.type in (NodeType.START, NodeType.MENU)),
                     None
                 )
             
@@ -2326,33 +2832,27 @@ class ConvoService:
                 return None
             
             # Add user message to history
-            session.history.append({
-                "role": "user",
-                "content": user_input,
-                "node_id": session.current_node_id,
-                "timestamp": datetime.utcnow().isoformat()
-            })
+            now = datetime.utcnow()
+            session.history.append(_mk_msg(
+                "user",
+                user_input,
+                session.current_node_id,
+                now
+            ))
             
             # Update session to start node
             session.current_node_id = start_node.id
             
             # Add bot response to history
-            session.history.append({
-                "role": "assistant",
-                "content": start_node.message or "Returning to main menu...",
-                "node_id": start_node.id,
-                "timestamp": datetime.utcnow().isoformat()
-            })
+            session.history.append(_mk_msg(
+                "assistant",
+                start_node.message or "Returning to main menu...",
+                start_node.id,
+                now
+            ))
             
             # Build options for start node
-            options = []
-            if start_node.type == NodeType.MENU and start_node.transitions:
-                for idx, transition in enumerate(start_node.transitions, 1):
-                    options.append({
-                        "value": str(idx),
-                        "label": transition.label or f"Option {idx}",
-                        "target_node_id": transition.target_node_id
-                    })
+            options = self._build_options(start_node, session.context)
             
             # Execute actions
             if start_node.actions:
@@ -2383,22 +2883,9 @@ class ConvoService:
             
             logger.info(f"Navigation: Returned to main menu (node: {start_node.id})")
             
-            # Check for Telegram Config
-            metadata = self._get_telegram_metadata(start_node, session)
-
-            return {
-                "message": rendered_message,
-                "node_id": start_node.id,
-                "node_type": start_node.type,
-                "requires_input": start_node.collect_input,
-                "input_type": start_node.input_type if start_node.collect_input else None,
-                "input_field": start_node.input_field if start_node.collect_input else None,
-                "completed": False,
-                "options": options,
-                "metadata": metadata
-            }
+            return self._node_response(session, start_node, rendered_message, options, completed=False)
         
-        elif command in ["back", "previous"]:
+        elif command in _BACK_COMMANDS:
             # Go back to previous node (if history exists)
             if len(session.history) >= 2:
                 # Find the last assistant message before the current one
@@ -2406,40 +2893,31 @@ class ConvoService:
                     msg = session.history[i]
                     if msg.get("role") == "assistant" and msg.get("node_id") != session.current_node_id:
                         previous_node_id = msg.get("node_id")
-                        previous_node = next(
-                            (node for node in convo.nodes if node.id == previous_node_id),
-                            None
-                        )
+                        previous_node = self._node_index(convo).get(previous_node_id)
                         
                         if previous_node:
                             # Add user message to history
-                            session.history.append({
-                                "role": "user",
-                                "content": user_input,
-                                "node_id": session.current_node_id,
-                                "timestamp": datetime.utcnow().isoformat()
-                            })
+                            now = datetime.utcnow()
+                            session.history.append(_mk_msg(
+                                "user",
+                                user_input,
+                                session.current_node_id,
+                                now
+                            ))
                             
                             # Update session to previous node
                             session.current_node_id = previous_node.id
                             
                             # Add bot response to history
-                            session.history.append({
-                                "role": "assistant",
-                                "content": previous_node.message or "Going back...",
-                                "node_id": previous_node.id,
-                                "timestamp": datetime.utcnow().isoformat()
-                            })
+                            session.history.append(_mk_msg(
+                                "assistant",
+                                previous_node.message or "Going back...",
+                                previous_node.id,
+                                now
+                            ))
                             
                             # Build options
-                            options = []
-                            if previous_node.type == NodeType.MENU and previous_node.transitions:
-                                for idx, transition in enumerate(previous_node.transitions, 1):
-                                    options.append({
-                                        "value": str(idx),
-                                        "label": transition.label or f"Option {idx}",
-                                        "target_node_id": transition.target_node_id
-                                    })
+                            options = self._build_options(previous_node, session.context)
                             
                             # Execute actions
                             if previous_node.actions:
@@ -2469,68 +2947,43 @@ class ConvoService:
 
                             logger.info(f"Navigation: Returned to previous node (node: {previous_node.id})")
                             
-                            # Check for Telegram Config
-                            metadata = self._get_telegram_metadata(previous_node, session)
-
-                            return {
-                                "message": rendered_message,
-                                "node_id": previous_node.id,
-                                "node_type": previous_node.type,
-                                "requires_input": previous_node.collect_input,
-                                "input_type": previous_node.input_type if previous_node.collect_input else None,
-                                "input_field": previous_node.input_field if previous_node.collect_input else None,
-                                "completed": False,
-                                "options": options, # Re-using the options built above
-                                "metadata": metadata
-                            }
+                            return self._node_response(session, previous_node, rendered_message, options, completed=False)
                         break
         
-        elif command in ["restart", "start over", "hello", "hi"]:
+        elif command in _RESTART_COMMANDS:
             # Restart the conversation
-            start_node = next(
-                (node for node in convo.nodes if node.id == convo.start_node_id),
-                None
-            )
+            start_node = self._node_index(convo).get(convo.start_node_id)
             
             if start_node:
                 # Clear context and history
 
                 identifier = session.context.get("identifier")
+                
+                # The AI chat session of the old run would be orphaned by the context reset
+                ai_session_id = session.context.get("ai_session_id")
+                if ai_session_id:
+                    _spawn_background(self._discard_ai_chat_session(ai_session_id))
 
                 session.context = {"identifier": identifier}
                 session.history = []
+                session._history_flushed = None
                 session.current_node_id = start_node.id
                 
                 # Add initial bot message
-                session.history.append({
-                    "role": "assistant",
-                    "content": start_node.message or "Starting over...",
-                    "node_id": start_node.id,
-                    "timestamp": datetime.utcnow().isoformat()
-                })
+                session.history.append(_mk_msg(
+                    "assistant",
+                    start_node.message or "Starting over...",
+                    start_node.id
+                ))
                 
                 # Build options
-                options = []
-                if start_node.type == NodeType.MENU and start_node.transitions:
-                    for idx, transition in enumerate(start_node.transitions, 1):
-                        options.append({
-                            "value": str(idx),
-                            "label": transition.label or f"Option {idx}",
-                            "target_node_id": transition.target_node_id
-                        })
+                options = self._build_options(start_node, session.context)
                 
                 logger.info("Navigation: Restarted conversation")
                 
-                return {
-                    "message": start_node.message or "Starting over...",
-                    "node_id": start_node.id,
-                    "node_type": start_node.type,
-                    "requires_input": start_node.collect_input,
-                    "input_type": start_node.input_type if start_node.collect_input else None,
-                    "input_field": start_node.input_field if start_node.collect_input else None,
-                    "completed": False,
-                    "options": options
-                }
+                return self._node_response(
+                    session, start_node, start_node.message or "Starting over...", options, completed=False
+                )
         
         return None
     
@@ -2548,13 +3001,14 @@ class ConvoService:
             final_user_id = user_id or request.user_id
             
             # Create session object
+            now = datetime.utcnow()
             session = AIChatSession(
                 session_id=session_id,
                 user_id=final_user_id,
                 tenant_uid=request.metadata.get('tenant_uid') if request.metadata else None,
-                title=request.title or f"Chat Session {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}",
-                created_at=datetime.utcnow(),
-                last_used=datetime.utcnow(),
+                title=request.title or f"Chat Session {now.strftime('%Y-%m-%d %H:%M')}",
+                created_at=now,
+                last_used=now,
                 active=True,
                 metadata=request.metadata
             )
@@ -2594,24 +3048,61 @@ class ConvoService:
                 http_status_code=500
             )
     
+    async def _get_ai_chat_session_lite(self, session_id: str) -> Optional[AIChatSession]:
+        """Get the identifying fields of an AI chat session for the chat path.
+        
+        Only ``session_id``, ``user_id``, ``tenant_uid`` and ``active`` are read,
+        and the document is not re-validated; other fields keep their defaults.
+        """
+        try:
+            session_dict = await self.ai_chat_sessions_collection.find_one(
+                {"session_id": session_id},
+                projection={"_id": 0, "session_id": 1, "user_id": 1, "tenant_uid": 1, "active": 1}
+            )
+            if not session_dict:
+                return None
+            
+            return AIChatSession.model_construct(**session_dict)
+            
+        except Exception as e:
+            logger.error(f"Error getting AI chat session: {e}")
+            raise APIServiceException(
+                message="Failed to get AI chat session",
+                details={"error": str(e)},
+                http_status_code=500
+            )
+    
     async def list_ai_chat_sessions(
         self,
         user_id: Optional[str] = None,
         active_only: bool = True,
-        skip: int = 0,
-        limit: int = 50
+        limit: int = 50,
+        after_last_used: Optional[datetime] = None,
+        after_session_id: Optional[str] = None
     ) -> List[AIChatSession]:
-        """List AI chat sessions."""
+        """List AI chat sessions, most recently used first.
+        
+        Pass the ``last_used`` and ``session_id`` of the last session of a page
+        as ``after_last_used`` / ``after_session_id`` to get the next page; each
+        page costs the same however deep it is.
+        """
         try:
             query = {}
             if user_id:
                 query["user_id"] = user_id
             if active_only:
                 query["active"] = True
+            if after_last_used is not None:
+                if after_session_id is not None:
+                    query["$or"] = [
+                        {"last_used": {"$lt": after_last_used}},
+                        {"last_used": after_last_used, "session_id": {"$lt": after_session_id}}
+                    ]
+                else:
+                    query["last_used"] = {"$lt": after_last_used}
             
             cursor = self.ai_chat_sessions_collection.find(query)\
-                .sort("last_used", -1)\
-                .skip(skip)\
+                .sort([("last_used", -1), ("session_id", -1)])\
                 .limit(limit)
             
             sessions = []
@@ -2638,62 +3129,60 @@ class ConvoService:
         try:
             # Get or create session
             session = None
+            chat_history = []
             if query.session_id:
-                session = await self.get_ai_chat_session(query.session_id)
+                if query.include_chat_history:
+                    # Both reads only need the session ID, so overlap their round-trips
+                    session, chat_history = await asyncio.gather(
+                        self._get_ai_chat_session_lite(query.session_id),
+                        self._get_ai_chat_history(
+                            query.session_id,
+                            limit=query.max_history_messages
+                        )
+                    )
+                else:
+                    session = await self._get_ai_chat_session_lite(query.session_id)
                 if not session:
                     raise APIServiceException(
                         message=f"AI chat session '{query.session_id}' not found",
                         http_status_code=404
                     )
             else:
-                # Create new session
+                # Create new session (it has no history to read yet)
                 session = await self.create_ai_chat_session(
                     AIChatSessionCreate(user_id=user_id),
                     user_id=user_id
                 )
+
+            user_message = {"role": "user", "content": query.query, "timestamp": datetime.utcnow()}
             
-            # Get chat history if requested
-            chat_history = []
-            if query.include_chat_history:
-                chat_history = await self._get_ai_chat_history(
+            # Call AI service
+            try:
+                ai_response = await self._call_ai_service(
                     session.session_id,
-                    limit=query.max_history_messages
+                    query.query,
+                    chat_history,
+                    AINodeConfig(llm_model=query.llm_model, llm_provider=query.llm_provider)
                 )
+            except Exception:
+                # Keep the user's message even when there is no answer
+                _spawn_background(self._save_ai_chat_messages(
+                    session.session_id, [user_message], session.tenant_uid
+                ))
+                raise
             
-            # Save user message to history
-            await self._save_ai_chat_message(
-                session.session_id,
-                "user",
-                query.query,
-                session.tenant_uid
-            )
-            
-            # Call AI service
-            ai_response = await self._call_ai_service(
-                session.session_id,
-                query.query,
-                chat_history,
-                query.llm_model,
-                query.llm_provider
-            )
-            
-            # Save AI response to history
-            await self._save_ai_chat_message(
+            # Persist the user/assistant pair in one insert, off the response path
+            _spawn_background(self._save_ai_chat_messages(
                 session.session_id,
-                "assistant",
-                ai_response,
+                [
+                    user_message,
+                    {"role": "assistant", "content": ai_response, "timestamp": datetime.utcnow()}
+                ],
                 session.tenant_uid
-            )
+            ))
             
-            # Update session last_used
-            await self.ai_chat_sessions_collection.update_one(
-                {"session_id": session.session_id},
-                {
-                    "$set": {
-                        "last_used": datetime.utcnow()
-                    }
-                }
-            )
+            # Update session last_used off the response path
+            _spawn_background(self._touch_ai_chat_session(session.session_id))
             
             # Create response
             response = AIChatResponse(
@@ -2729,70 +3218,46 @@ class ConvoService:
     ) -> str:
         """Call the external AI service."""
         try:
-            
-            login_url = f"{self.ai_service_url}/api/v1/auth/login"
-
-            login_payload = {
-                "email": self.settings.ai_system_user,
-                "password": self.settings.ai_system_password
-            }
-            login_headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                login_response = await client.post(
-                    login_url,
-                    json=login_payload,
-                    headers=login_headers
-                )
-                
-                login_response.raise_for_status()
-                login_json = login_response.json()
-                token = login_json["access_token"]
-            
             url = f"{self.ai_service_url}/api/v1/query/" + ai_config.query_type
             
             payload = {
+                **_AI_QUERY_DEFAULTS,
                 "session_id": session_id,
                 "query": query,
                 "chat_history": chat_history,
                 "llm_model": ai_config.llm_model,
                 "llm_provider": ai_config.llm_provider,
-                "system_message": ai_config.system_prompt,
-                "max_history_messages": 10,
-                "max_documents": 10,
-                "min_score": 0.1,
-                "strategy": "simple",
-                "include_metadata": True,
-                "include_chat_history": False,
-                "max_history_messages": 5,
-                "temperature": 0.1,
-                "filter": {"source_table": "frequently_asked_questions"}
+                "system_message": ai_config.system_prompt
             }
             
-            headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Authorization': f"Bearer {token}"
-            }
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(url, json=payload, headers=headers)
-                
-                if response.status_code != 200:
-                    logger.error(f"AI service error: {response.status_code} - {response.text}")
-                    raise APIServiceException(
-                        message="AI service returned an error",
-                        details={
-                            "status_code": response.status_code,
-                            "error": response.text
-                        },
-                        http_status_code=500
-                    )
-                
-                result = response.json()
-                return result.get("answer", "I apologize, but I couldn't generate a response.")
+            body = orjson.dumps(payload)
+            
+            # Retry once with a fresh token if the cached one was rejected
+            for attempt in range(2):
+                token = await self._get_ai_token()
+                headers = {
+                'Content-Type': 'application/json',
+                'Accept': 'application/json',
+                'Authorization': f"Bearer {token}"
+                }
+                response = await self._http.post(url, content=body, headers=headers, timeout=60.0)
+                if response.status_code != 401 or attempt:
+                    break
+                invalidate_ai_token(token)
+            
+            if response.status_code != 200:
+                logger.error(f"AI service error: {response.status_code} - {response.text}")
+                raise APIServiceException(
+                    message="AI service returned an error",
+                    details={
+                        "status_code": response.status_code,
+                        "error": response.text
+                    },
+                    http_status_code=500
+                )
+            
+            result = orjson.loads(response.content)
+            return result.get("answer", "I apologize, but I couldn't generate a response.")
                 
         except httpx.TimeoutException:
             logger.error("AI service request timed out")
@@ -2816,15 +3281,11 @@ class ConvoService:
         """Get chat history for a session."""
         try:
             cursor = self.ai_chat_history_collection.find(
-                {"session_id": session_id}
+                {"session_id": session_id},
+                projection={"_id": 0, "role": 1, "content": 1}
             ).sort("timestamp", -1).limit(limit)
             
-            messages = []
-            async for msg in cursor:
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
+            messages = await cursor.to_list(length=limit or None)
             
             # Reverse to maintain chronological order (oldest first)
             messages.reverse()
@@ -2838,25 +3299,52 @@ class ConvoService:
                 http_status_code=500
             )
     
-    async def _save_ai_chat_message(
+    async def _touch_ai_chat_session(self, session_id: str) -> None:
+        """Set an AI chat session's last_used to the database server's current time."""
+        try:
+            await self.ai_chat_sessions_collection.update_one(
+                {"session_id": session_id},
+                {"$currentDate": {"last_used": True}}
+            )
+        except Exception as e:
+            logger.error(f"Error updating AI chat session last_used: {e}")
+            # Don't raise exception as this shouldn't break the flow
+
+    async def _discard_ai_chat_session(self, session_id: str) -> None:
+        """Delete an AI chat session's history and mark the session inactive."""
+        try:
+            await asyncio.gather(
+                self.ai_chat_history_collection.delete_many({"session_id": session_id}),
+                self.ai_chat_sessions_collection.update_one(
+                    {"session_id": session_id},
+                    {"$set": {"active": False}}
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error discarding AI chat session {session_id}: {e}")
+            # Don't raise exception as this shouldn't break the flow
+
+    async def _save_ai_chat_messages(
         self,
         session_id: str,
-        role: str,
-        content: str,
+        messages: List[Dict[str, Any]],
         tenant_uid: Optional[str] = None
     ) -> None:
-        """Save a message to AI chat history."""
+        """Save several messages to AI chat history with a single insert."""
         try:
-            message = {
-                "session_id": session_id,
-                "role": role,
-                "content": content,
-                "tenant_uid": tenant_uid,
-                "timestamp": datetime.utcnow()
-            }
+            docs = [
+                {
+                    "session_id": session_id,
+                    "role": message["role"],
+                    "content": message["content"],
+                    "tenant_uid": tenant_uid,
+                    "timestamp": message.get("timestamp") or datetime.utcnow()
+                }
+                for message in messages
+            ]
             
-            await self.ai_chat_history_collection.insert_one(message)
+            await self.ai_chat_history_collection.insert_many(docs, ordered=False)
             
         except Exception as e:
-            logger.error(f"Error saving AI chat message: {e}")
+            logger.error(f"Error saving AI chat messages: {e}")
             # Don't raise exception as this shouldn't break the flow
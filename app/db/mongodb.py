@@ -202,6 +202,9 @@ class MongoDBManager:
             # Created by index
             await convos_collection.create_index("created_by")
             
+            # Compound index for list_convos tenant/creator filters
+            await convos_collection.create_index([("tenant_uid", 1), ("created_by", 1)])
+            
             # Create chat_sessions collection indexes
             sessions_collection = self.database["chat_sessions"]
             
@@ -229,6 +232,15 @@ class MongoDBManager:
             # User ID index
             await ai_sessions_collection.create_index("user_id")
             
+            # Compound indexes for list_ai_chat_sessions filters and keyset paging
+            # (active sessions only / all sessions)
+            await ai_sessions_collection.create_index(
+                [("user_id", 1), ("active", 1), ("last_used", -1), ("session_id", -1)]
+            )
+            await ai_sessions_collection.create_index(
+                [("user_id", 1), ("last_used", -1), ("session_id", -1)]
+            )
+            
             # Create ai_chat_history collection indexes
             ai_history_collection = self.database["ai_chat_history"]
             
@@ -241,6 +253,9 @@ class MongoDBManager:
             # Timestamp index for sorting
             await ai_history_collection.create_index("timestamp")
             
+            # Compound index for the latest messages of a session
+            await ai_history_collection.create_index([("session_id", 1), ("timestamp", -1)])
+            
             self.logger.info("Service collections initialized with tenant_uid indexes")
             
         except Exception as e:
@@ -0,0 +1,203 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, AsyncMock, patch
+import orjson
+
+from app.core.services.convo_service import ConvoService, invalidate_ai_token
+from app.core.models.convo import AINodeConfig, ChatSession, ConvoDefinition
+from app.core.utils.exceptions import APIServiceException
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, sub_query) for sub_query in condition):
+                return False
+        elif isinstance(condition, dict):
+            if not doc[key] < condition["$lt"]:
+                return False
+        elif doc[key] != condition:
+            return False
+    return True
+
+class _FakeCursor:
+    """Just enough of a Motor cursor for find().sort().limit() queries."""
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self._docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, limit):
+        self._docs = self._docs[:limit]
+        return self
+
+    async def _iterate(self):
+        for doc in self._docs:
+            yield dict(doc)
+
+    def __aiter__(self):
+        return self._iterate()
+
+class _FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query):
+        return _FakeCursor([doc for doc in self.docs if _matches(doc, query)])
+
+def _response(status_code, data):
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = orjson.dumps(data)
+    response.text = response.content.decode()
+    return response
+
+class TestConvoAiService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        invalidate_ai_token()
+        self.addCleanup(invalidate_ai_token)
+
+        settings = MagicMock()
+        settings.ai_service_url = "http://ai"
+        self.service = ConvoService(settings, AsyncMock(), AsyncMock())
+
+    async def test_rejected_token_is_refreshed_and_retried_once(self):
+        tokens = iter(["token-1", "token-2"])
+        query_statuses = iter([401, 200, 200])
+        query_tokens = []
+
+        async def post(url, **kwargs):
+            if url.endswith("/auth/login"):
+                return _response(200, {"access_token": next(tokens), "expires_in": 3600})
+            query_tokens.append(kwargs["headers"]["Authorization"])
+            return _response(next(query_statuses), {"answer": "Hello"})
+
+        mock_client = AsyncMock()
+        mock_client.post.side_effect = post
+
+        with patch("app.core.services.convo_service.get_http_client", return_value=mock_client):
+            answer = await self.service._call_ai_service("session1", "Hi", [], AINodeConfig())
+
+            self.assertEqual(answer, "Hello")
+            # One login for the first token, exactly one re-auth after the 401
+            self.assertEqual(query_tokens, ["Bearer token-1", "Bearer token-2"])
+            self.assertEqual(mock_client.post.await_count, 4)
+
+            # The refreshed token is cached for later calls
+            await self.service._call_ai_service("session1", "Hi again", [], AINodeConfig())
+            self.assertEqual(query_tokens[-1], "Bearer token-2")
+            self.assertEqual(mock_client.post.await_count, 5)
+
+    async def test_second_401_is_not_retried_again(self):
+        tokens = iter(["token-1", "token-2"])
+
+        async def post(url, **kwargs):
+            if url.endswith("/auth/login"):
+                return _response(200, {"access_token": next(tokens), "expires_in": 3600})
+            return _response(401, {"detail": "Unauthorized"})
+
+        mock_client = AsyncMock()
+        mock_client.post.side_effect = post
+
+        with patch("app.core.services.convo_service.get_http_client", return_value=mock_client):
+            with self.assertRaises(APIServiceException):
+                await self.service._call_ai_service("session1", "Hi", [], AINodeConfig())
+
+            # Login, query, re-auth, retried query; no further attempts
+            self.assertEqual(mock_client.post.await_count, 4)
+
+class TestAiChatExit(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.service = ConvoService(MagicMock(), AsyncMock(), AsyncMock())
+        self.convo = ConvoDefinition(
+            id="convo1",
+            name="Support",
+            start_node_id="ai",
+            nodes=[
+                {
+                    "id": "ai",
+                    "name": "Assistant",
+                    "type": "ai_chat",
+                    "ai_config": {"exit_keywords": ["bye"], "exit_node_id": "done"}
+                },
+                {"id": "done", "name": "Done", "type": "end", "message": "Goodbye!"}
+            ]
+        )
+
+    async def _exit(self):
+        session = ChatSession(
+            session_id="test_session",
+            convo_id="convo1",
+            current_node_id="ai",
+            context={},
+            history=[]
+        )
+        response = await self.service._process_ai_chat_node(session, self.convo.nodes[0], "ok bye", self.convo)
+        self.assertEqual(session.current_node_id, "done")
+        return response
+
+    async def test_exit_responses_do_not_share_state(self):
+        first = await self._exit()
+        self.assertEqual(first["message"], "Goodbye!")
+        self.assertTrue(first["completed"])
+
+        first["message"] = "changed"
+        first["options"].append({"text": "Again", "value": "again"})
+
+        second = await self._exit()
+        self.assertEqual(second["message"], "Goodbye!")
+        self.assertEqual(second["options"], [])
+        self.assertIsNot(second["options"], first["options"])
+
+class TestListAiChatSessions(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.service = ConvoService(MagicMock(), AsyncMock(), AsyncMock())
+        noon = datetime(2024, 5, 1, 12, 0)
+        # Three sessions share a last_used value, so pages must break ties on session_id
+        self.docs = [
+            {"_id": i, "session_id": session_id, "user_id": "user1", "active": active, "last_used": last_used}
+            for i, (session_id, last_used, active) in enumerate([
+                ("s1", datetime(2024, 5, 1, 9, 0), True),
+                ("s2", noon, True),
+                ("s3", noon, True),
+                ("s4", noon, True),
+                ("s5", datetime(2024, 5, 1, 15, 0), True),
+                ("s6", datetime(2024, 5, 1, 10, 0), True),
+                ("s7", datetime(2024, 5, 1, 11, 0), False),
+            ])
+        ]
+        self.service.ai_chat_sessions_collection = _FakeCollection(self.docs)
+
+    async def _pages(self, limit):
+        pages = []
+        after_last_used = after_session_id = None
+        while True:
+            page = await self.service.list_ai_chat_sessions(
+                user_id="user1",
+                limit=limit,
+                after_last_used=after_last_used,
+                after_session_id=after_session_id
+            )
+            pages.append([session.session_id for session in page])
+            if len(page) < limit:
+                return pages
+            after_last_used, after_session_id = page[-1].last_used, page[-1].session_id
+
+    async def test_pages_break_ties_on_session_id(self):
+        pages = await self._pages(limit=2)
+
+        self.assertEqual(pages, [["s5", "s4"], ["s3", "s2"], ["s6", "s1"], []])
+
+    async def test_last_page_is_short(self):
+        pages = await self._pages(limit=4)
+
+        self.assertEqual(pages, [["s5", "s4", "s3", "s2"], ["s6", "s1"]])
+
+    async def test_pages_cover_every_active_session_once(self):
+        for limit in range(1, 8):
+            with self.subTest(limit=limit):
+                pages = await self._pages(limit=limit)
+                listed = [session_id for page in pages for session_id in page]
+                self.assertEqual(listed, ["s5", "s4", "s3", "s2", "s6", "s1"])
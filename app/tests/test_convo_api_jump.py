@@ -31,6 +31,7 @@ class TestConvoApiJump(unittest.IsolatedAsyncioTestCase):
         api_config = ApiAction(
             url="http://test.com",
             method="GET",
+            headers={"X-Test": "1"},
             output=[]
         )
         
@@ -41,25 +42,22 @@ class TestConvoApiJump(unittest.IsolatedAsyncioTestCase):
             on_failure="failure_node"
         )
         
-        # Mock httpx.AsyncClient
+        # Mock the shared httpx client
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"data": "ok"}
+        mock_response.content = b'{"data": "ok"}'
         
         mock_client = AsyncMock()
-        mock_client.__aenter__.return_value = mock_client
-        mock_client.__aexit__.return_value = None
-        mock_client.get.return_value = mock_response
-        mock_client.post.return_value = mock_response
-        mock_client.put.return_value = mock_response
-        mock_client.delete.return_value = mock_response
-        
-        with patch("httpx.AsyncClient", return_value=mock_client):
+        mock_client.request.return_value = mock_response
+        
+        with patch("app.core.services.convo_service.get_http_client", return_value=mock_client):
             # Execute
             result = await self.service._execute_api_action(session, action)
             
             # Verify
             self.assertEqual(result, "success_node")
+            # The shared convo definition's headers are not modified
+            self.assertEqual(api_config.headers, {"X-Test": "1"})
             
     async def test_execute_api_action_failure_jump(self):
         # Setup
@@ -84,20 +82,18 @@ class TestConvoApiJump(unittest.IsolatedAsyncioTestCase):
             on_failure="failure_node"
         )
         
-        # Mock httpx.AsyncClient to raise error
+        # Mock the shared httpx client to raise error
         mock_response = MagicMock()
         mock_response.status_code = 500
         mock_request = MagicMock()
         
         mock_client = AsyncMock()
-        mock_client.__aenter__.return_value = mock_client
-        mock_client.__aexit__.return_value = None
         
         # Properly construct exception
         error = httpx.HTTPStatusError("Error", request=mock_request, response=mock_response)
-        mock_client.get.side_effect = error
+        mock_client.request.side_effect = error
         
-        with patch("httpx.AsyncClient", return_value=mock_client):
+        with patch("app.core.services.convo_service.get_http_client", return_value=mock_client):
             # Execute
             result = await self.service._execute_api_action(session, action)
             
@@ -132,3 +128,92 @@ class TestConvoApiJump(unittest.IsolatedAsyncioTestCase):
         
         # Verify
         self.assertEqual(result, "jump_target")
+
+    async def test_execute_node_actions_runs_independent_api_calls(self):
+        # Setup
+        session = ChatSession(
+            session_id="test_session",
+            convo_id="test_convo",
+            current_node_id="node1",
+            context={},
+            history=[]
+        )
+        
+        # a and b are independent; c reads a's output so it must run after them
+        action_a = NodeAction(type="api_call", api_action=ApiAction(url="a", method="GET", output=["x"]))
+        action_b = NodeAction(type="api_call", api_action=ApiAction(url="b", method="GET", output=["y"]))
+        action_c = NodeAction(type="api_call", api_action=ApiAction(url="c", method="GET", input=["x"]))
+        
+        node = ConvoNode(
+            id="node1",
+            name="Test Node",
+            type=NodeType.MESSAGE,
+            actions=[action_a, action_b, action_c]
+        )
+        
+        steps = self.service._group_node_actions(node.actions)
+        self.assertEqual(steps, [[action_a, action_b], action_c])
+        
+        # An action that overwrites an earlier batch member's input must wait for it
+        action_d = NodeAction(type="api_call", api_action=ApiAction(url="d", method="GET", output=["x"]))
+        self.assertEqual(
+            self.service._group_node_actions([action_c, action_d]),
+            [action_c, action_d]
+        )
+        
+        self.service._call_api_action = AsyncMock(return_value=({}, None))
+        
+        # Execute
+        result = await self.service._execute_node_actions(session, node)
+        
+        # Verify
+        self.assertIsNone(result)
+        self.assertEqual(self.service._call_api_action.await_count, 3)
+
+    async def test_concurrent_api_calls_match_sequential_context(self):
+        # Whichever call finishes last, the context must end up as if the
+        # actions had run in order: the last action decides api_error
+        for slow_url, failing_url in (("a", "a"), ("a", "b"), ("b", "a"), ("b", "b")):
+            with self.subTest(slow=slow_url, failing=failing_url):
+                async def request(method, url, **kwargs):
+                    await asyncio.sleep(0.02 if url == slow_url else 0)
+                    if url == failing_url:
+                        raise httpx.HTTPStatusError(
+                            "Error", request=MagicMock(), response=MagicMock(status_code=500)
+                        )
+                    response = MagicMock(status_code=200)
+                    response.content = b'{"x": 1, "y": 2}'
+                    return response
+                
+                mock_client = AsyncMock()
+                mock_client.request.side_effect = request
+                
+                actions = [
+                    NodeAction(type="api_call", api_action=ApiAction(url="a", method="GET", output=["x"])),
+                    NodeAction(type="api_call", api_action=ApiAction(url="b", method="GET", output=["y"]))
+                ]
+                node = ConvoNode(id="node1", name="Test Node", type=NodeType.MESSAGE, actions=actions)
+                self.assertEqual(self.service._group_node_actions(node.actions), [actions])
+                
+                contexts = []
+                for concurrent in (False, True):
+                    session = ChatSession(
+                        session_id="test_session",
+                        convo_id="test_convo",
+                        current_node_id="node1",
+                        context={"api_error": "stale", "x": 0, "y": 0},
+                        history=[]
+                    )
+                    with patch("app.core.services.convo_service.get_http_client", return_value=mock_client):
+                        if concurrent:
+                            await self.service._execute_node_actions(session, node)
+                        else:
+                            for action in actions:
+                                await self.service._execute_api_action(session, action)
+                    contexts.append(session.context)
+                
+                sequential_context, concurrent_context = contexts
+                self.assertEqual(concurrent_context, sequential_context)
+                self.assertEqual(sequential_context["api_error"] is None, failing_url == "a")
+                self.assertEqual(sequential_context["x"], None if failing_url == "a" else 1)
+                self.assertEqual(sequential_context["y"], None if failing_url == "b" else 2)
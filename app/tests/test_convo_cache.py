@@ -0,0 +1,115 @@
+import unittest
+import asyncio
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from app.core.services import convo_service
+from app.core.services.convo_service import ConvoService, invalidate_convo_cache
+from app.core.models.convo import ConvoDefinition
+
+def _convo_doc(name="Support"):
+    return {
+        "_id": "mongo-id",
+        "id": "convo1",
+        "name": name,
+        "start_node_id": "node1",
+        "nodes": [{"id": "node1", "name": "Start", "type": "message", "message": "Hi"}]
+    }
+
+class TestConvoCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        invalidate_convo_cache()
+        self.addCleanup(invalidate_convo_cache)
+
+        settings = MagicMock()
+        settings.convo_cache_ttl_seconds = 60.0
+        self.service = ConvoService(settings, AsyncMock(), AsyncMock())
+        self.service.convos_collection = AsyncMock()
+        self.find_one = self.service.convos_collection.find_one
+        self.find_one.side_effect = lambda *args, **kwargs: _convo_doc()
+
+    async def test_repeated_reads_hit_the_cache(self):
+        first = await self.service.get_convo("convo1")
+        second = await self.service.get_convo("convo1")
+
+        self.assertIs(first, second)
+        self.assertEqual(self.find_one.await_count, 1)
+
+    async def test_update_invalidates_cached_convo(self):
+        await self.service.get_convo("convo1")
+        self.service.convos_collection.replace_one.return_value = MagicMock(matched_count=1)
+
+        await self.service.update_convo("convo1", ConvoDefinition(**_convo_doc("Renamed")))
+        self.find_one.side_effect = lambda *args, **kwargs: _convo_doc("Renamed")
+        convo = await self.service.get_convo("convo1")
+
+        self.assertEqual(convo.name, "Renamed")
+        self.assertEqual(self.find_one.await_count, 2)
+
+    async def test_delete_invalidates_cached_convo(self):
+        await self.service.get_convo("convo1")
+        self.service.convos_collection.delete_one.return_value = MagicMock(deleted_count=1)
+
+        await self.service.delete_convo("convo1")
+        self.find_one.side_effect = None
+        self.find_one.return_value = None
+
+        self.assertIsNone(await self.service.get_convo("convo1"))
+
+    async def test_concurrent_misses_share_one_load(self):
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_find_one(*args, **kwargs):
+            started.set()
+            await release.wait()
+            return _convo_doc()
+        self.find_one.side_effect = slow_find_one
+
+        # Requests are served by separate service instances
+        services = [ConvoService(self.service.settings, AsyncMock(), AsyncMock()) for _ in range(3)]
+        for service in services:
+            service.convos_collection = self.service.convos_collection
+        tasks = [asyncio.ensure_future(service.get_convo("convo1")) for service in services]
+        await started.wait()
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        self.assertEqual(self.find_one.await_count, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    async def test_load_racing_an_invalidation_is_not_cached(self):
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_find_one(*args, **kwargs):
+            started.set()
+            await release.wait()
+            return _convo_doc("Stale")
+        self.find_one.side_effect = slow_find_one
+
+        task = asyncio.ensure_future(self.service.get_convo("convo1"))
+        await started.wait()
+
+        # The convo is updated while the old version is still being read
+        invalidate_convo_cache("convo1")
+        release.set()
+        stale = await task
+
+        self.assertEqual(stale.name, "Stale")
+        self.find_one.side_effect = lambda *args, **kwargs: _convo_doc("Fresh")
+        convo = await self.service.get_convo("convo1")
+        self.assertEqual(convo.name, "Fresh")
+        self.assertEqual(self.find_one.await_count, 2)
+
+    async def test_entries_expire_after_ttl(self):
+        with patch.object(convo_service, "time") as mock_time:
+            mock_time.monotonic.return_value = 1000.0
+            await self.service.get_convo("convo1")
+
+            mock_time.monotonic.return_value = 1059.0
+            await self.service.get_convo("convo1")
+            self.assertEqual(self.find_one.await_count, 1)
+
+            mock_time.monotonic.return_value = 1061.0
+            await self.service.get_convo("convo1")
+            self.assertEqual(self.find_one.await_count, 2)
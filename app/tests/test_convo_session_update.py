@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+
+from app.core.services.convo_service import ConvoService
+from app.core.models.convo import ChatSession
+from app.core.utils.exceptions import APIServiceException
+
+def _msg(content):
+    return {"role": "user", "content": content, "node_id": "node1"}
+
+class TestConvoSessionUpdate(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.service = ConvoService(MagicMock(), AsyncMock(), AsyncMock())
+        self.service.sessions_collection = AsyncMock()
+
+    def _session(self, history, flushed):
+        session = ChatSession(
+            session_id="test_session",
+            convo_id="test_convo",
+            current_node_id="node1",
+            context={"name": "Ada"},
+            history=history
+        )
+        session._history_flushed = flushed
+        return session
+
+    def _sent_update(self):
+        self.service.sessions_collection.update_one.assert_awaited_once()
+        query, update = self.service.sessions_collection.update_one.await_args.args
+        self.assertEqual(query, {"session_id": "test_session"})
+        return update
+
+    async def test_pushes_only_new_history_entries(self):
+        session = self._session([_msg("a"), _msg("b"), _msg("c")], flushed=2)
+
+        await self.service._update_session(session)
+
+        update = self._sent_update()
+        self.assertEqual(update["$push"], {"history": {"$each": [_msg("c")]}})
+        self.assertNotIn("history", update["$set"])
+        self.assertEqual(update["$set"]["context"], {"name": "Ada"})
+        self.assertEqual(session._history_flushed, 3)
+
+    async def test_no_history_write_when_nothing_was_appended(self):
+        session = self._session([_msg("a")], flushed=1)
+
+        await self.service._update_session(session)
+
+        update = self._sent_update()
+        self.assertNotIn("$push", update)
+        self.assertNotIn("history", update["$set"])
+        self.assertEqual(session._history_flushed, 1)
+
+    async def test_sets_whole_history_after_restart(self):
+        # A restart replaces the history and resets the flushed count
+        session = self._session([_msg("a"), _msg("b"), _msg("c")], flushed=None)
+
+        await self.service._update_session(session)
+
+        update = self._sent_update()
+        self.assertNotIn("$push", update)
+        self.assertEqual(update["$set"]["history"], [_msg("a"), _msg("b"), _msg("c")])
+        self.assertEqual(session._history_flushed, 3)
+
+    async def test_sets_whole_history_after_truncation(self):
+        session = self._session([_msg("a")], flushed=4)
+
+        await self.service._update_session(session)
+
+        update = self._sent_update()
+        self.assertNotIn("$push", update)
+        self.assertEqual(update["$set"]["history"], [_msg("a")])
+        self.assertEqual(session._history_flushed, 1)
+
+    async def test_flushed_count_unchanged_when_write_fails(self):
+        session = self._session([_msg("a"), _msg("b")], flushed=1)
+        self.service.sessions_collection.update_one.side_effect = Exception("connection lost")
+
+        with self.assertRaises(APIServiceException):
+            await self.service._update_session(session)
+        self.assertEqual(session._history_flushed, 1)
+
+        # The next successful write pushes the entry that was not persisted
+        self.service.sessions_collection.update_one.side_effect = None
+        self.service.sessions_collection.update_one.reset_mock()
+        await self.service._update_session(session)
+
+        update = self._sent_update()
+        self.assertEqual(update["$push"], {"history": {"$each": [_msg("b")]}})
+        self.assertEqual(session._history_flushed, 2)
@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+
+from app.core.services.convo_service import ConvoService
+from app.core.models.convo import ValidationRule
+
+# (validation type, params, input, accepted)
+VALIDATION_CASES = [
+    ("required", {}, "hello", True),
+    ("required", {}, "", False),
+    ("required", {}, "   ", False),
+    ("min_length", {"value": 3}, "abc", True),
+    ("min_length", {"min": 3}, "ab", False),
+    ("min_length", {"value": 3}, " a ", True),
+    ("max_length", {"value": 3}, "abc", True),
+    ("max_length", {"max": 3}, "abcd", False),
+    ("max_length", {}, "a" * 1000, True),
+    ("max_length", {}, "a" * 1001, False),
+    ("length", {"min": 2, "max": 4}, "abc", True),
+    ("length", {"min": 2, "max": 4}, "a", False),
+    ("length", {"min": 2, "max": 4}, "abcde", False),
+    ("email", {}, "ada@example.com", True),
+    ("email", {}, "  ada.l+x@mail.example.org  ", True),
+    ("email", {}, "ada@example", False),
+    ("email", {}, "ada example.com", False),
+    ("email", {}, "ada@example.com extra", False),
+    ("phone", {}, "+1 (555) 123-4567", True),
+    ("phone", {}, "5551234567", True),
+    ("phone", {}, "555-1234", False),
+    ("phone", {}, "1234567890123456", False),
+    ("phone", {}, "555123456a", False),
+    ("number", {}, " 3.14 ", True),
+    ("number", {}, "-2e3", True),
+    ("number", {}, "abc", False),
+    ("integer", {}, " 42 ", True),
+    ("integer", {}, "4.2", False),
+    ("regex", {"pattern": r"[A-Z]{3}"}, "ABC", True),
+    ("regex", {"value": r"[A-Z]{3}"}, "ABCdef", True),
+    ("regex", {"pattern": r"[A-Z]{3}"}, "abc", False),
+    ("regex", {}, "anything", True),
+    ("range", {"min": 1, "max": 10}, "5", True),
+    ("range", {"min": 1, "max": 10}, "10", True),
+    ("range", {"min": 1, "max": 10}, "11", False),
+    ("range", {"min": 1}, "0.5", False),
+    ("range", {}, "ten", False),
+    ("url", {}, "https://example.com/path?q=1", True),
+    ("url", {}, "HTTP://EXAMPLE.COM", True),
+    ("url", {}, "ftp://example.com", False),
+    ("url", {}, "https://exa mple.com", False),
+    ("date", {}, "2024-02-29", True),
+    ("date", {}, "2023-02-29", False),
+    ("date", {"format": "%d/%m/%Y"}, "31/12/2024", True),
+    ("date", {"format": "%d/%m/%Y"}, "2024-12-31", False),
+    ("alphanumeric", {}, "abc123", True),
+    ("alphanumeric", {}, "abc\n", True),
+    ("alphanumeric", {}, "abc 123", False),
+    ("alphanumeric", {}, " abc", False),
+    ("alpha", {}, "abc", True),
+    ("alpha", {}, "abc\n", True),
+    ("alpha", {}, "abc1", False),
+    ("in_list", {"values": ["yes", "no"]}, " yes ", True),
+    ("in_list", {"list": ["yes", "no"]}, "maybe", False),
+    ("not_in_list", {"values": ["admin"]}, "admin", False),
+    ("not_in_list", {"values": ["admin"]}, "ada", True),
+    ("unknown_type", {}, "anything", True),
+]
+
+class TestConvoValidation(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.service = ConvoService(MagicMock(), AsyncMock(), AsyncMock())
+
+    async def test_validation_results(self):
+        for validation_type, params, user_input, accepted in VALIDATION_CASES:
+            with self.subTest(type=validation_type, params=params, input=user_input):
+                rule = ValidationRule(type=validation_type, params=params, error_message="Invalid")
+                valid, error = await self.service._validate_input(user_input, [rule])
+                self.assertEqual(valid, accepted)
+                self.assertEqual(error, None if accepted else "Invalid")
+
+    async def test_default_error_messages(self):
+        cases = [
+            ("required", {}, "", "This field is required."),
+            ("min_length", {"value": 3}, "ab", "Input must be at least 3 characters."),
+            ("email", {}, "nope", "Please enter a valid email address."),
+            ("range", {"min": 1, "max": 10}, "11", "Value must be between 1 and 10."),
+            ("in_list", {"values": ["yes", "no"]}, "maybe", "Input must be one of: yes, no."),
+        ]
+        for validation_type, params, user_input, message in cases:
+            with self.subTest(type=validation_type):
+                rule = ValidationRule(type=validation_type, params=params, error_message="")
+                self.assertEqual(
+                    await self.service._validate_input(user_input, [rule]),
+                    (False, message)
+                )
+
+    async def test_first_failing_rule_wins(self):
+        rules = [
+            ValidationRule(type="required", error_message="Required"),
+            ValidationRule(type="email", error_message="Bad email"),
+            ValidationRule(type="max_length", params={"value": 5}, error_message="Too long")
+        ]
+        self.assertEqual(await self.service._validate_input("", rules), (False, "Required"))
+        self.assertEqual(await self.service._validate_input("a@b.co", rules), (False, "Too long"))
+        self.assertEqual(await self.service._validate_input("ab.co", rules), (False, "Bad email"))
@@ -16,6 +16,7 @@ from app.api.v1.router import api_router
 from app.web.router import router as web_router
 from app.core.utils.exceptions import APIServiceException, convert_exception_to_http
 from app.db.mongodb import init_mongodb, close_mongodb
+from app.core.services.convo_service import close_http_client, close_smtp_connections
 
 
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
@@ -84,6 +85,14 @@ async def lifespan(app: FastAPI):
         await close_mongodb()
         logger.info("✅ MongoDB connection closed")
         
+        # Close shared HTTP client
+        await close_http_client()
+        logger.info("✅ HTTP client closed")
+        
+        # Close cached SMTP connections
+        await close_smtp_connections()
+        logger.info("✅ SMTP connections closed")
+        
     except Exception as e:
         logger.error(f"❌ Error during shutdown: {e}")
     